@@ -8,14 +8,21 @@ from .routes.auth import router as auth_router
 from .routes.persons import router as persons_router
 from .routes.salaries import router as salaries_router
 from .routes.stats import router as stats_router
+from .routes.metrics import router as metrics_router
+from .services.metrics import start_event_loop_monitor, track_request
+from .services.profiling import profile_request
+from .services.slow_queries import remember_request
+from .services.database import read_pool, tortoise_config, run_maintenance, start_maintenance
+from .services.schema import prepare_database
+from .utils.serialization import FastJSONResponse
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from config import CORS_ORIGINS, DB_PATH
+from config import CORS_ORIGINS, METRICS_ENABLED, PROFILE_REQUESTS, SLOW_QUERY_MS
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Salarium", version="0.1.0")
+    app = FastAPI(title="Salarium", version="0.1.0", default_response_class=FastJSONResponse)
 
     app.add_middleware(
         CORSMiddleware,
@@ -23,37 +30,69 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
     )
 
-    # Add simple no-store cache headers for stats endpoints to ensure fresh data after salary mutations
+    # Routes guarded by conditional_get leave their ETag on request.state: send it and make
+    # browsers revalidate on every use. Other stats responses (e.g. errors) are never stored.
     @app.middleware("http")
     async def add_cache_headers(request, call_next):
         response = await call_next(request)
         try:
-            path = request.url.path
-            if path.startswith("/api/stats"):
+            etag = getattr(request.state, "etag", None)
+            if etag and response.status_code in (200, 304):
+                response.headers["ETag"] = etag
+                response.headers["Cache-Control"] = "private, no-cache"
+            elif request.url.path.startswith("/api/stats"):
                 response.headers["Cache-Control"] = "no-store"
         except Exception:
             pass
         return response
 
+    if SLOW_QUERY_MS > 0:
+        app.middleware("http")(remember_request)
+    if METRICS_ENABLED:
+        app.middleware("http")(track_request)
+
+    # Outermost, so the total covers the other middleware too
+    if PROFILE_REQUESTS:
+        app.middleware("http")(profile_request)
+
     app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
     app.include_router(persons_router, prefix="/api/persons", tags=["persons"])
     app.include_router(salaries_router, prefix="/api/salaries", tags=["salaries"])
     app.include_router(stats_router, prefix="/api/stats", tags=["stats"])
+    app.include_router(metrics_router, prefix="/api")
 
     register_tortoise(
         app,
-        db_url=f"sqlite://{DB_PATH}",
-        modules={"models": [
+        config=tortoise_config([
             "app.models.user",
             "app.models.person",
             "app.models.salary_record",
-        ]},
-        generate_schemas=True,
+        ]),
+        generate_schemas=False,
         add_exception_handlers=True,
     )
 
+    # Runs after the ORM is initialised: migrates existing tables before creating missing ones
+    @app.on_event("startup")
+    async def init_schema():
+        await prepare_database()
+        await run_maintenance()
+        # Opened once the schema is in place
+        await read_pool.open()
+        app.state.db_maintenance = start_maintenance()
+        app.state.loop_monitor = start_event_loop_monitor()
+
+    @app.on_event("shutdown")
+    async def close_database():
+        for name in ("db_maintenance", "loop_monitor"):
+            task = getattr(app.state, name, None)
+            if task is not None:
+                task.cancel()
+        await read_pool.close()
+
     static_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
     if os.path.exists(static_dir):
         @app.get("/{full_path:path}")
@@ -0,0 +1,65 @@
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Optional, Union
+
+from tortoise.fields import DecimalField
+from tortoise.models import Model
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from config import AMOUNT_STORAGE
+
+
+CENTS_STORAGE = AMOUNT_STORAGE == "cents"
+
+# Declared column types per storage mode on SQLite; the migration compares against these
+DECIMAL_SQL_TYPE = "VARCHAR(40)"
+CENTS_SQL_TYPE = "BIGINT"
+
+
+def to_amount(value: Any) -> Decimal:
+    """Yuan amount (Decimal, float, str or None) as a Decimal rounded ROUND_HALF_UP to cents."""
+    d = value if isinstance(value, Decimal) else Decimal(str(value or 0))
+    return d.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def decimal_to_cents(value: Any) -> int:
+    """Yuan amount (Decimal, float, str or None) to whole cents, rounded ROUND_HALF_UP."""
+    return int(to_amount(value).scaleb(2))
+
+
+class CentsField(DecimalField):
+    """Money amount stored as a BIGINT number of cents.
+
+    Python values are the same Decimals a DecimalField(decimal_places=2) yields,
+    so callers are unaffected; only the column holds integers, which SQLite sums
+    without casting text to NUMERIC. Integers handed to the field are read as
+    cents (that is what the database returns), so assign Decimal or float
+    amounts from application code.
+    """
+
+    SQL_TYPE = CENTS_SQL_TYPE
+
+    class _db_sqlite:
+        SQL_TYPE = CENTS_SQL_TYPE
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(max_digits=15, decimal_places=2, **kwargs)
+
+    def to_db_value(self, value: Any, instance: "Union[type[Model], Model]") -> Optional[int]:
+        self.validate(value)
+        if value is None:
+            return None
+        return decimal_to_cents(value)
+
+    def to_python_value(self, value: Any) -> Optional[Decimal]:
+        if isinstance(value, int) and not isinstance(value, bool):
+            value = Decimal(value).scaleb(-2)
+        return super().to_python_value(value)
+
+
+def MoneyField(**kwargs: Any) -> DecimalField:
+    """Salary money column, stored according to AMOUNT_STORAGE."""
+    if CENTS_STORAGE:
+        return CentsField(**kwargs)
+    return DecimalField(max_digits=15, decimal_places=2, **kwargs)
@@ -16,4 +16,5 @@ class Person(Model):
     created_at = fields.DatetimeField(auto_now_add=True)
 
     class Meta:
-        table = "persons"
\ No newline at end of file
+        table = "persons"
+        indexes = (("user_id",),)
\ No newline at end of file
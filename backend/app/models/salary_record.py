@@ -1,39 +1,89 @@
 from tortoise import fields
 from tortoise.models import Model
 
+from .fields import MoneyField
+
+
+# Money columns entered for a salary record
+AMOUNT_FIELDS = (
+    "base_salary",
+    "performance_salary",
+    "high_temp_allowance",
+    "low_temp_allowance",
+    "computer_allowance",
+    "communication_allowance",
+    "meal_allowance",
+    "mid_autumn_benefit",
+    "dragon_boat_benefit",
+    "spring_festival_benefit",
+    "other_income",
+    "comprehensive_allowance",
+    "pension_insurance",
+    "medical_insurance",
+    "unemployment_insurance",
+    "critical_illness_insurance",
+    "enterprise_annuity",
+    "housing_fund",
+    "other_deductions",
+    "labor_union_fee",
+    "performance_deduction",
+    "tax",
+)
+
+# Payroll totals derived from the amounts (see compute_payroll), stored on every
+# write so listings and SUMs read them instead of recomputing them
+TOTAL_FIELDS = (
+    "total_income",
+    "total_deductions",
+    "net_income",
+    "actual_take_home",
+    "non_cash_benefits",
+)
+
+# Every money column of a record: the entered amounts and the stored totals
+MONEY_FIELDS = AMOUNT_FIELDS + TOTAL_FIELDS
 
 class SalaryRecord(Model):
     id = fields.IntField(pk=True)
     person = fields.ForeignKeyField("models.Person", related_name="salary_records")
+    # Denormalized from person.user_id so per-user queries avoid joining persons
+    user = fields.ForeignKeyField("models.User", related_name="salary_records")
     year = fields.IntField()
     month = fields.IntField()  # 1-12
 
     # Fixed income fields
-    base_salary = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
-    performance_salary = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
-    high_temp_allowance = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
-    low_temp_allowance = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
-    computer_allowance = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
-    communication_allowance = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
-    meal_allowance = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
-    mid_autumn_benefit = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
-    dragon_boat_benefit = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
-    spring_festival_benefit = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
-    other_income = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
-    comprehensive_allowance = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
+    base_salary = MoneyField(default=0)
+    performance_salary = MoneyField(default=0)
+    high_temp_allowance = MoneyField(default=0)
+    low_temp_allowance = MoneyField(default=0)
+    computer_allowance = MoneyField(default=0)
+    communication_allowance = MoneyField(default=0)
+    meal_allowance = MoneyField(default=0)
+    mid_autumn_benefit = MoneyField(default=0)
+    dragon_boat_benefit = MoneyField(default=0)
+    spring_festival_benefit = MoneyField(default=0)
+    other_income = MoneyField(default=0)
+    comprehensive_allowance = MoneyField(default=0)
 
     # Fixed deduction fields
-    pension_insurance = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
-    medical_insurance = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
-    unemployment_insurance = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
-    critical_illness_insurance = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
-    enterprise_annuity = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
-    housing_fund = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
-    other_deductions = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
-    labor_union_fee = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
-    performance_deduction = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
-
-    tax = fields.DecimalField(max_digits=15, decimal_places=2, default=0)
+    pension_insurance = MoneyField(default=0)
+    medical_insurance = MoneyField(default=0)
+    unemployment_insurance = MoneyField(default=0)
+    critical_illness_insurance = MoneyField(default=0)
+    enterprise_annuity = MoneyField(default=0)
+    housing_fund = MoneyField(default=0)
+    other_deductions = MoneyField(default=0)
+    labor_union_fee = MoneyField(default=0)
+    performance_deduction = MoneyField(default=0)
+
+    tax = MoneyField(default=0)
+
+    # Derived totals (TOTAL_FIELDS), written together with the amounts
+    total_income = MoneyField(default=0)
+    total_deductions = MoneyField(default=0)
+    net_income = MoneyField(default=0)
+    actual_take_home = MoneyField(default=0)
+    non_cash_benefits = MoneyField(default=0)
 
     note = fields.CharField(max_length=255, null=True)
     created_at = fields.DatetimeField(auto_now_add=True)
@@ -42,3 +92,8 @@ class SalaryRecord(Model):
     class Meta:
         table = "salary_records"
         unique_together = ("person_id", "year", "month")
+        indexes = (
+            # person_id lets keyset pages over (year, month, person_id, id) stop at LIMIT without a sort
+            ("user_id", "year", "month", "person_id"),
+            ("user_id", "person_id", "year", "month"),
+        )
@@ -7,6 +7,8 @@ class User(Model):
     username = fields.CharField(max_length=64, unique=True)
     password_hash = fields.CharField(max_length=128)
     created_at = fields.DatetimeField(auto_now_add=True)
+    # Bumped by every salary/person write; part of the stats response cache key
+    data_version = fields.IntField(default=0)
 
     class Meta:
         table = "users"
\ No newline at end of file
@@ -3,7 +3,7 @@ from tortoise.exceptions import IntegrityError, DoesNotExist
 
 from ..models import User
 from ..schemas.auth import LoginRequest, RegisterRequest, TokenResponse, UserOut
-from ..utils.auth import verify_password, hash_password, create_access_token, get_current_user
+from ..utils.auth import verify_password_async, hash_password_async, create_access_token, get_current_user
 
 
 router = APIRouter()
@@ -12,7 +12,7 @@ router = APIRouter()
 @router.post("/register", response_model=UserOut)
 async def register(payload: RegisterRequest):
     try:
-        hashed_password = hash_password(payload.password)
+        hashed_password = await hash_password_async(payload.password)
         user = await User.create(username=payload.username, password_hash=hashed_password)
         return UserOut(id=user.id, username=user.username)
     except IntegrityError:
@@ -28,7 +28,7 @@ async def login(payload: LoginRequest):
     except DoesNotExist:
         raise HTTPException(status_code=400, detail="用户名或密码错误")
 
-    if not verify_password(payload.password, user.password_hash):
+    if not await verify_password_async(payload.password, user.password_hash):
         raise HTTPException(status_code=400, detail="用户名或密码错误")
 
     token = create_access_token({"sub": user.username})
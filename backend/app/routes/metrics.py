@@ -0,0 +1,39 @@
+import secrets
+
+from fastapi import APIRouter, HTTPException, Request, Response, status
+
+from ..services.metrics import CONTENT_TYPE, render
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from config import METRICS_ENABLED, METRICS_TOKEN
+
+router = APIRouter()
+
+_LOOPBACK = {"127.0.0.1", "::1", "localhost"}
+
+
+def _allowed(request: Request) -> bool:
+    if METRICS_TOKEN:
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        return scheme.lower() == "bearer" and secrets.compare_digest(token.encode(), METRICS_TOKEN.encode())
+    return request.client is not None and request.client.host in _LOOPBACK
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus scrape target; values are summed over all workers.
+
+    Served to requests carrying ``Authorization: Bearer <METRICS_TOKEN>``, or,
+    without a token configured, to local requests only.
+    """
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not _allowed(request):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="无权访问监控指标",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return Response(content=render(), media_type=CONTENT_TYPE)
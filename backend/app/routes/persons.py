@@ -1,15 +1,17 @@
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List
+from tortoise.transactions import in_transaction
 
 from ..models import Person
 from ..schemas.person import PersonCreate, PersonUpdate, PersonOut
+from ..services.cache import bump_data_version, conditional_get
 from ..utils.auth import get_current_user
 
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[PersonOut])
+@router.get("/", response_model=List[PersonOut], dependencies=[Depends(conditional_get)])
 async def list_persons(user=Depends(get_current_user)):
     persons = await Person.filter(user_id=user.id).all()
     return [PersonOut(
@@ -24,14 +26,17 @@ async def list_persons(user=Depends(get_current_user)):
 
 @router.post("/", response_model=PersonOut)
 async def create_person(payload: PersonCreate, user=Depends(get_current_user)):
-    p = await Person.create(
-        name=payload.name, 
-        note=payload.note, 
-        user_id=user.id,
-        pension_history=payload.pension_history,
-        medical_history=payload.medical_history,
-        housing_fund_history=payload.housing_fund_history
-    )
+    async with in_transaction() as conn:
+        p = await Person.create(
+            using_db=conn,
+            name=payload.name, 
+            note=payload.note, 
+            user_id=user.id,
+            pension_history=payload.pension_history,
+            medical_history=payload.medical_history,
+            housing_fund_history=payload.housing_fund_history
+        )
+        await bump_data_version(user.id, conn)
     return PersonOut(
         id=p.id, 
         name=p.name, 
@@ -57,7 +62,9 @@ async def update_person(person_id: int, payload: PersonUpdate, user=Depends(get_
         p.medical_history = payload.medical_history
     if payload.housing_fund_history is not None:
         p.housing_fund_history = payload.housing_fund_history
-    await p.save()
+    async with in_transaction() as conn:
+        await p.save(using_db=conn)
+        await bump_data_version(user.id, conn)
     return PersonOut(
         id=p.id, 
         name=p.name, 
@@ -70,7 +77,9 @@ async def update_person(person_id: int, payload: PersonUpdate, user=Depends(get_
 
 @router.delete("/{person_id}")
 async def delete_person(person_id: int, user=Depends(get_current_user)):
-    deleted = await Person.filter(id=person_id, user_id=user.id).delete()
-    if not deleted:
-        raise HTTPException(status_code=404, detail="人员不存在")
+    async with in_transaction() as conn:
+        deleted = await Person.filter(id=person_id, user_id=user.id).using_db(conn).delete()
+        if not deleted:
+            raise HTTPException(status_code=404, detail="人员不存在")
+        await bump_data_version(user.id, conn)
     return {"ok": True}
\ No newline at end of file
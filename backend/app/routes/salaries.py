@@ -1,92 +1,313 @@
+from itertools import islice
+from types import SimpleNamespace
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from tortoise import timezone
+from tortoise.transactions import in_transaction
 
 from ..models import SalaryRecord, Person
-from ..schemas.salary import SalaryCreate, SalaryUpdate, SalaryOut
-from ..services.payroll import compute_payroll
+from ..models.fields import to_amount
+from ..models.salary_record import AMOUNT_FIELDS, MONEY_FIELDS, TOTAL_FIELDS
+from ..schemas.salary import (
+    SalaryCreate, SalaryUpdate, SalaryOut, SalaryImportError, SalaryImportResult,
+    SalaryBatchRequest, SalaryBatchItemResult, SalaryBatchResult,
+)
+from ..services.cache import bump_data_version, conditional_get
+from ..services.payroll import compute_payroll, set_totals
+from ..services.salary_import import IMPORT_BATCH_SIZE, iter_sheet_rows, parse_salary_row
+from ..services.stats_queries import RECORD_ORDER, after_record_q
 from ..utils.auth import get_current_user
+from ..utils.serialization import FastJSONResponse
 
 
 router = APIRouter()
 
 
+# SalaryOut fields read from another column; gross income is the total income
+_SOURCE_COLUMNS = {"gross_income": "total_income"}
+# Page size used when a cursor is given without a limit, and the largest page served
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+# Most items (creates + updates + deletes) accepted by one batch request
+MAX_BATCH_ITEMS = 2000
+
+
 def to_out(rec: SalaryRecord) -> SalaryOut:
-    data = compute_payroll(
-        base_salary=rec.base_salary,
-        performance_salary=rec.performance_salary,
-        high_temp_allowance=rec.high_temp_allowance,
-        low_temp_allowance=rec.low_temp_allowance,
-        computer_allowance=rec.computer_allowance,
-        communication_allowance=rec.communication_allowance,
-        meal_allowance=rec.meal_allowance,
-        mid_autumn_benefit=rec.mid_autumn_benefit,
-        dragon_boat_benefit=rec.dragon_boat_benefit,
-        spring_festival_benefit=rec.spring_festival_benefit,
-        other_income=rec.other_income,
-        comprehensive_allowance=rec.comprehensive_allowance,
-        pension_insurance=rec.pension_insurance,
-        medical_insurance=rec.medical_insurance,
-        unemployment_insurance=rec.unemployment_insurance,
-        critical_illness_insurance=rec.critical_illness_insurance,
-        enterprise_annuity=rec.enterprise_annuity,
-        housing_fund=rec.housing_fund,
-        other_deductions=rec.other_deductions,
-        labor_union_fee=rec.labor_union_fee,
-        performance_deduction=rec.performance_deduction,
-        tax=rec.tax,
-    )
-    return SalaryOut(
+    # Built without validation: every amount is converted to the declared float here
+    return SalaryOut.model_construct(
         id=rec.id,
         year=rec.year,
         month=rec.month,
-        base_salary=rec.base_salary,
-        performance_salary=rec.performance_salary,
-        high_temp_allowance=rec.high_temp_allowance,
-        low_temp_allowance=rec.low_temp_allowance,
-        computer_allowance=rec.computer_allowance,
-        communication_allowance=rec.communication_allowance,
-        meal_allowance=rec.meal_allowance,
-        mid_autumn_benefit=rec.mid_autumn_benefit,
-        dragon_boat_benefit=rec.dragon_boat_benefit,
-        spring_festival_benefit=rec.spring_festival_benefit,
-        other_income=rec.other_income,
-        comprehensive_allowance=rec.comprehensive_allowance,
-        pension_insurance=rec.pension_insurance,
-        medical_insurance=rec.medical_insurance,
-        unemployment_insurance=rec.unemployment_insurance,
-        critical_illness_insurance=rec.critical_illness_insurance,
-        enterprise_annuity=rec.enterprise_annuity,
-        housing_fund=rec.housing_fund,
-        other_deductions=rec.other_deductions,
-        labor_union_fee=rec.labor_union_fee,
-        performance_deduction=rec.performance_deduction,
-        tax=data["tax"],
-        total_income=data["total_income"],
-        total_deductions=data["total_deductions"],
-        gross_income=data["gross_income"],
-        net_income=data["net_income"],
-        actual_take_home=data["actual_take_home"],
-        non_cash_benefits=data["non_cash_benefits"],
+        **{f: float(getattr(rec, f)) for f in MONEY_FIELDS},
+        gross_income=float(rec.total_income),
         note=rec.note,
     )
 
 
-@router.get("/", response_model=List[SalaryOut])
+def to_out_many(recs: List[SalaryRecord]) -> List[SalaryOut]:
+    return [to_out(rec) for rec in recs]
+
+
+@router.get("/", response_model=List[SalaryOut], dependencies=[Depends(conditional_get)])
 async def list_salaries(
     user=Depends(get_current_user),
     person_id: Optional[int] = Query(default=None),
     year: Optional[int] = Query(default=None),
     month: Optional[int] = Query(default=None),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE, description="每页条数；给出时按 (year, month, person_id, id) 分页"),
+    cursor: Optional[str] = Query(default=None, description="上一页响应头 X-Next-Cursor 的值"),
+    fields: Optional[str] = Query(default=None, description="逗号分隔的返回字段，如 id,year,month,net_income"),
 ):
-    q = SalaryRecord.filter(person__user_id=user.id)
+    """List salary records.
+
+    Without ``limit``/``cursor``/``fields`` every matching record is returned
+    in id order, as before. ``limit`` or ``cursor`` switch to keyset pagination
+    in (year, month, person_id, id) order: the cursor of the next page is sent
+    in the X-Next-Cursor header and is absent on the last page. ``fields``
+    selects the returned keys; only the matching columns are read. The
+    derived totals are stored columns, so no listing recomputes them.
+    """
+    q = SalaryRecord.filter(user_id=user.id)
     if person_id:
         q = q.filter(person_id=person_id)
     if year:
         q = q.filter(year=year)
     if month:
         q = q.filter(month=month)
-    records = await q.all()
-    return [to_out(r) for r in records]
+    if limit is None and cursor is None and fields is None:
+        records = await q.order_by("id")
+        # Returned as a response so FastAPI does not validate the list against response_model again
+        return FastJSONResponse(to_out_many(records))
+
+    names = _parse_fields(fields)
+    headers = {}
+    if limit is None and cursor is None:
+        q = q.order_by("id")
+        rows = await q.values(*_projection_columns(names))
+    else:
+        limit = limit or DEFAULT_PAGE_SIZE
+        if cursor is not None:
+            q = q.filter(after_record_q(_decode_cursor(cursor)))
+        # One row past the page tells whether another page follows
+        rows = await q.order_by(*RECORD_ORDER).limit(limit + 1).values(*_projection_columns(names))
+        if len(rows) > limit:
+            rows = rows[:limit]
+            headers["X-Next-Cursor"] = _encode_cursor(rows[-1])
+    return FastJSONResponse(_project(rows, names), headers=headers)
+
+
+def _parse_fields(fields: Optional[str]) -> List[str]:
+    if fields is None:
+        return list(SalaryOut.model_fields)
+    names = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in names if f not in SalaryOut.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"未知字段: {', '.join(unknown)}")
+    if not names:
+        raise HTTPException(status_code=400, detail="fields 不能为空")
+    return names
+
+
+def _projection_columns(names: List[str]) -> List[str]:
+    """Columns to SELECT for ``names``, plus the cursor key."""
+    columns = dict.fromkeys(RECORD_ORDER)
+    columns.update(dict.fromkeys(_SOURCE_COLUMNS.get(f, f) for f in names))
+    return list(columns)
+
+
+def _project(rows: List[dict], names: List[str]) -> List[dict]:
+    """Shape ``.values()`` rows like SalaryOut restricted to ``names`` (amounts as floats)."""
+    sources = [(f, _SOURCE_COLUMNS.get(f, f)) for f in names]
+    return [
+        {f: float(r[c]) if c in MONEY_FIELDS else r[c] for f, c in sources}
+        for r in rows
+    ]
+
+
+def _encode_cursor(row: dict) -> str:
+    return ".".join(str(row[k]) for k in RECORD_ORDER)
+
+
+def _decode_cursor(cursor: str) -> SimpleNamespace:
+    try:
+        values = [int(v) for v in cursor.split(".")]
+    except ValueError:
+        values = []
+    if len(values) != len(RECORD_ORDER):
+        raise HTTPException(status_code=400, detail="cursor 无效")
+    return SimpleNamespace(**dict(zip(RECORD_ORDER, values)))
+
+
+# Declared before "/{person_id}" so the path is not parsed as a person id
+@router.post("/import", response_model=SalaryImportResult)
+async def import_salaries(
+    file: UploadFile = File(..., description="CSV 或 XLSX，首行为字段名"),
+    person_id: Optional[int] = Query(default=None, description="文件没有 person_id/person_name 列时使用的人员ID"),
+    user=Depends(get_current_user),
+):
+    """Bulk import salary records from a spreadsheet.
+
+    Rows are parsed and validated in batches; invalid rows are reported and
+    skipped. Valid rows are upserted on (person_id, year, month) in one
+    transaction, so re-importing a file updates the existing months. When a
+    file repeats a month for a person, its last row wins.
+    """
+    persons = await Person.filter(user_id=user.id).all()
+    if person_id is not None and not any(p.id == person_id for p in persons):
+        raise HTTPException(status_code=404, detail="人员不存在")
+
+    rows = iter_sheet_rows(file.file, file.filename)
+    records = {}
+    errors: List[SalaryImportError] = []
+    while True:
+        # Parsing is blocking work; keep it off the event loop one batch at a time
+        try:
+            batch = await run_in_threadpool(lambda: list(islice(rows, IMPORT_BATCH_SIZE)))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"文件解析失败: {e}")
+        if not batch:
+            break
+        for n, values in batch:
+            try:
+                pid, fields = parse_salary_row(values, persons, person_id)
+            except ValueError as e:
+                errors.append(SalaryImportError(row=n, error=str(e)))
+                continue
+            records[(pid, fields["year"], fields["month"])] = SalaryRecord(person_id=pid, user_id=user.id, **fields)
+
+    created = updated = 0
+    if records:
+        set_totals(records.values())
+        async with in_transaction() as conn:
+            existing = await (
+                SalaryRecord.filter(user_id=user.id, person_id__in={k[0] for k in records}, year__in={k[1] for k in records})
+                .using_db(conn)
+                .values_list("person_id", "year", "month")
+            )
+            updated = len(records.keys() & set(existing))
+            created = len(records) - updated
+            await SalaryRecord.bulk_create(
+                list(records.values()),
+                batch_size=IMPORT_BATCH_SIZE,
+                on_conflict=["person_id", "year", "month"],
+                update_fields=[*MONEY_FIELDS, "note", "updated_at"],
+                using_db=conn,
+            )
+            await bump_data_version(user.id, conn)
+    return SalaryImportResult(created=created, updated=updated, errors=errors)
+
+
+# Declared before "/{person_id}" as well
+@router.post("/batch", response_model=SalaryBatchResult)
+async def batch_salaries(payload: SalaryBatchRequest, user=Depends(get_current_user)):
+    """Create, update and delete many salary records in one request.
+
+    Every item is checked first; items that cannot be applied (unknown person
+    or record, a month that already has a record, a record named twice) are
+    reported and skipped, as with import. The rest are applied in one
+    transaction with set-based statements: one DELETE, one UPDATE per batch
+    of updates and one INSERT per batch of creates. Results list the creates,
+    updates and deletes in request order; the derived totals of the written
+    records are computed in one vectorized pass and stored with them.
+    """
+    if len(payload.create) + len(payload.update) + len(payload.delete) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"单次最多 {MAX_BATCH_ITEMS} 项")
+
+    person_ids = set(await Person.filter(user_id=user.id).values_list("id", flat=True))
+    target_ids = {u.id for u in payload.update} | set(payload.delete)
+    existing = {r.id: r for r in await SalaryRecord.filter(user_id=user.id, id__in=target_ids)} if target_ids else {}
+    seen = set()
+
+    def claim(item: SalaryBatchItemResult, record_id: int) -> Optional[SalaryRecord]:
+        rec = existing.get(record_id)
+        if rec is None:
+            item.error = "记录不存在"
+        elif record_id in seen:
+            item.error = "同一记录重复操作"
+        else:
+            seen.add(record_id)
+        return None if item.error else rec
+
+    creates, updates, deletes = {}, {}, []
+    update_items, delete_items = [], []
+    for i, u in enumerate(payload.update):
+        item = SalaryBatchItemResult(op="update", index=i, id=u.id)
+        update_items.append(item)
+        rec = claim(item, u.id)
+        if rec is not None:
+            for field, value in u.model_dump(exclude_unset=True, exclude={"id"}).items():
+                setattr(rec, field, to_amount(value) if field in AMOUNT_FIELDS else value)
+            rec.updated_at = timezone.now()
+            updates[rec.id] = (item, rec)
+    for i, rid in enumerate(payload.delete):
+        item = SalaryBatchItemResult(op="delete", index=i, id=rid)
+        delete_items.append(item)
+        rec = claim(item, rid)
+        if rec is not None:
+            deletes.append(rec)
+
+    create_items = []
+    if payload.create:
+        # Deletes run first, so their months are free for the creates
+        occupied = set(await (
+            SalaryRecord.filter(user_id=user.id, person_id__in={c.person_id for c in payload.create}, year__in={c.year for c in payload.create})
+            .values_list("person_id", "year", "month")
+        )) - {(r.person_id, r.year, r.month) for r in deletes}
+        for i, c in enumerate(payload.create):
+            item = SalaryBatchItemResult(op="create", index=i)
+            create_items.append(item)
+            key = (c.person_id, c.year, c.month)
+            if c.person_id not in person_ids:
+                item.error = "人员不存在"
+            elif not 1 <= c.month <= 12:
+                item.error = f"month 无效: {c.month}"
+            elif key in occupied:
+                item.error = "该月份已有记录"
+            else:
+                occupied.add(key)
+                creates[key] = (item, SalaryRecord(
+                    person_id=c.person_id, user_id=user.id, year=c.year, month=c.month, note=c.note,
+                    **{f: to_amount(getattr(c, f)) for f in AMOUNT_FIELDS},
+                ))
+
+    keys = {(r.person_id, r.year, r.month) for r in deletes} | {(r.person_id, r.year, r.month) for _, r in updates.values()} | creates.keys()
+    set_totals([rec for _, rec in (*updates.values(), *creates.values())])
+    if keys:
+        async with in_transaction() as conn:
+            if deletes:
+                await SalaryRecord.filter(id__in=[r.id for r in deletes]).using_db(conn).delete()
+            if updates:
+                await SalaryRecord.bulk_update(
+                    [rec for _, rec in updates.values()],
+                    fields=[*MONEY_FIELDS, "note", "updated_at"],
+                    batch_size=IMPORT_BATCH_SIZE,
+                    using_db=conn,
+                )
+            if creates:
+                await SalaryRecord.bulk_create([rec for _, rec in creates.values()], batch_size=IMPORT_BATCH_SIZE, using_db=conn)
+                # SQLite bulk inserts do not report the new ids; read them back by month
+                for rec in await (
+                    SalaryRecord.filter(user_id=user.id, person_id__in={k[0] for k in creates}, year__in={k[1] for k in creates})
+                    .using_db(conn)
+                ):
+                    key = (rec.person_id, rec.year, rec.month)
+                    if key in creates:
+                        creates[key] = (creates[key][0], rec)
+            await bump_data_version(user.id, conn)
+
+    written = [*creates.values(), *updates.values()]
+    for (item, _), out in zip(written, to_out_many([rec for _, rec in written])):
+        item.id = out.id
+        item.record = out
+    return SalaryBatchResult(
+        created=len(creates),
+        updated=len(updates),
+        deleted=len(deletes),
+        results=[*create_items, *update_items, *delete_items],
+    )
 
 
 @router.post("/{person_id}", response_model=SalaryOut)
@@ -94,64 +315,28 @@ async def create_salary(person_id: int, payload: SalaryCreate, user=Depends(get_
     person = await Person.filter(id=person_id, user_id=user.id).first()
     if not person:
         raise HTTPException(status_code=404, detail="人员不存在")
-    calc = compute_payroll(
-        base_salary=payload.base_salary,
-        performance_salary=payload.performance_salary,
-        high_temp_allowance=payload.high_temp_allowance,
-        low_temp_allowance=payload.low_temp_allowance,
-        computer_allowance=payload.computer_allowance,
-        communication_allowance=payload.communication_allowance,
-        meal_allowance=payload.meal_allowance,
-        mid_autumn_benefit=payload.mid_autumn_benefit,
-        dragon_boat_benefit=payload.dragon_boat_benefit,
-        spring_festival_benefit=payload.spring_festival_benefit,
-        other_income=payload.other_income,
-        comprehensive_allowance=payload.comprehensive_allowance,
-        pension_insurance=payload.pension_insurance,
-        medical_insurance=payload.medical_insurance,
-        unemployment_insurance=payload.unemployment_insurance,
-        critical_illness_insurance=payload.critical_illness_insurance,
-        enterprise_annuity=payload.enterprise_annuity,
-        housing_fund=payload.housing_fund,
-        other_deductions=payload.other_deductions,
-        labor_union_fee=payload.labor_union_fee,
-        performance_deduction=payload.performance_deduction,
-        tax=payload.tax,
-    )
-    rec = await SalaryRecord.create(
-        person_id=person_id,
-        year=payload.year,
-        month=payload.month,
-        base_salary=payload.base_salary,
-        performance_salary=payload.performance_salary,
-        high_temp_allowance=payload.high_temp_allowance,
-        low_temp_allowance=payload.low_temp_allowance,
-        computer_allowance=payload.computer_allowance,
-        communication_allowance=payload.communication_allowance,
-        meal_allowance=payload.meal_allowance,
-        mid_autumn_benefit=payload.mid_autumn_benefit,
-        dragon_boat_benefit=payload.dragon_boat_benefit,
-        spring_festival_benefit=payload.spring_festival_benefit,
-        other_income=payload.other_income,
-        comprehensive_allowance=payload.comprehensive_allowance,
-        pension_insurance=payload.pension_insurance,
-        medical_insurance=payload.medical_insurance,
-        unemployment_insurance=payload.unemployment_insurance,
-        critical_illness_insurance=payload.critical_illness_insurance,
-        enterprise_annuity=payload.enterprise_annuity,
-        housing_fund=payload.housing_fund,
-        other_deductions=payload.other_deductions,
-        labor_union_fee=payload.labor_union_fee,
-        performance_deduction=payload.performance_deduction,
-        tax=calc["tax"],
-        note=payload.note,
-    )
+    # Rounded to the cent here, as batch and import do, so the stored amounts
+    # and the totals computed from them agree in either AMOUNT_STORAGE mode
+    amounts = {f: to_amount(getattr(payload, f)) for f in AMOUNT_FIELDS}
+    calc = compute_payroll(**amounts)
+    async with in_transaction() as conn:
+        rec = await SalaryRecord.create(
+            using_db=conn,
+            person_id=person_id,
+            user_id=user.id,
+            year=payload.year,
+            month=payload.month,
+            **amounts,
+            **{f: calc[f] for f in TOTAL_FIELDS},
+            note=payload.note,
+        )
+        await bump_data_version(user.id, conn)
     return to_out(rec)
 
 
 @router.get("/{record_id}", response_model=SalaryOut)
 async def get_salary(record_id: int, user=Depends(get_current_user)):
-    rec = await SalaryRecord.filter(id=record_id, person__user_id=user.id).first()
+    rec = await SalaryRecord.filter(id=record_id, user_id=user.id).first()
     if not rec:
         raise HTTPException(status_code=404, detail="记录不存在")
     return to_out(rec)
@@ -159,48 +344,30 @@ async def get_salary(record_id: int, user=Depends(get_current_user)):
 
 @router.put("/{record_id}", response_model=SalaryOut)
 async def update_salary(record_id: int, payload: SalaryUpdate, user=Depends(get_current_user)):
-    rec = await SalaryRecord.filter(id=record_id, person__user_id=user.id).first()
+    rec = await SalaryRecord.filter(id=record_id, user_id=user.id).first()
     if not rec:
         raise HTTPException(status_code=404, detail="记录不存在")
     for field, value in payload.model_dump(exclude_unset=True).items():
-        setattr(rec, field, value)
-    await rec.save()
-    calc = compute_payroll(
-        base_salary=rec.base_salary,
-        performance_salary=rec.performance_salary,
-        high_temp_allowance=rec.high_temp_allowance,
-        low_temp_allowance=rec.low_temp_allowance,
-        computer_allowance=rec.computer_allowance,
-        communication_allowance=rec.communication_allowance,
-        meal_allowance=rec.meal_allowance,
-        mid_autumn_benefit=rec.mid_autumn_benefit,
-        dragon_boat_benefit=rec.dragon_boat_benefit,
-        spring_festival_benefit=rec.spring_festival_benefit,
-        other_income=rec.other_income,
-        comprehensive_allowance=rec.comprehensive_allowance,
-        pension_insurance=rec.pension_insurance,
-        medical_insurance=rec.medical_insurance,
-        unemployment_insurance=rec.unemployment_insurance,
-        critical_illness_insurance=rec.critical_illness_insurance,
-        enterprise_annuity=rec.enterprise_annuity,
-        housing_fund=rec.housing_fund,
-        other_deductions=rec.other_deductions,
-        labor_union_fee=rec.labor_union_fee,
-        performance_deduction=rec.performance_deduction,
-        tax=rec.tax,
-    )
+        setattr(rec, field, to_amount(value) if field in AMOUNT_FIELDS else value)
+    calc = compute_payroll(**{f: getattr(rec, f) for f in AMOUNT_FIELDS})
     rec.tax = calc["tax"]
-    await rec.save()
+    for f in TOTAL_FIELDS:
+        setattr(rec, f, calc[f])
+    async with in_transaction() as conn:
+        await rec.save(using_db=conn)
+        await bump_data_version(user.id, conn)
     return to_out(rec)
 
 
 @router.delete("/{record_id}")
 async def delete_salary(record_id: int, user=Depends(get_current_user)):
     # 先查询记录是否存在并属于当前用户
-    rec = await SalaryRecord.filter(id=record_id, person__user_id=user.id).first()
+    rec = await SalaryRecord.filter(id=record_id, user_id=user.id).first()
     if not rec:
         raise HTTPException(status_code=404, detail="记录不存在")
     
-    # 直接删除记录
-    await rec.delete()
+    # 删除记录并更新数据版本
+    async with in_transaction() as conn:
+        await rec.delete(using_db=conn)
+        await bump_data_version(user.id, conn)
     return {"ok": True}
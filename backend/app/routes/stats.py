@@ -1,32 +1,46 @@
+from collections import namedtuple
 from typing import List, Optional
+from types import SimpleNamespace
 from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi.responses import StreamingResponse
 from decimal import Decimal
+from tortoise.expressions import Q
+from tortoise.functions import Sum
 
 from ..models import SalaryRecord, Person
+from ..models.salary_record import AMOUNT_FIELDS, MONEY_FIELDS
 from ..schemas.stats import (
     MonthlyStats, YearlyStats, FamilySummary,
     PersonCumulativeInsurance, BenefitStats, IncomeComposition,
     MonthlyNetIncome, GrossVsNetMonthly,
     DeductionsBreakdown, DeductionsMonthly, DeductionsBreakdownItem,
     ContributionsCumulative, ContributionsCumulativePoint,
-    MonthlyTableRow, AnnualTableRow, AnnualMonthlyRow,
+    MonthlyTableRow, AnnualTableRow, AnnualMonthlyRow, StatsDashboard,
 )
 from ..utils.auth import get_current_user
-from ..services.payroll import compute_payroll
+from ..services.stats_queries import fetch_rows, group_rows, iter_record_chunks, sum_records
+from ..services.cache import cached_response, conditional_get
+from ..services.database import read_db
+from ..services.table_export import (
+    ANNUAL_TABLE_COLUMNS, EXPORT_MEDIA_TYPES, MONTHLY_TABLE_COLUMNS, export_stream,
+)
+
 
+router = APIRouter(dependencies=[Depends(conditional_get)])
 
-router = APIRouter()
+# Narrow rows for the scans that read only a few columns (see fetch_rows)
+_BenefitRow = namedtuple("_BenefitRow", (
+    "year", "month", "person_id", "meal_allowance", "mid_autumn_benefit", "dragon_boat_benefit", "spring_festival_benefit",
+))
+_ContributionRow = namedtuple("_ContributionRow", ("year", "month", "pension_insurance", "medical_insurance", "housing_fund"))
 
 
 # Helpers for stats calculations aligned with the unified calculation spec
 _D = lambda v: v if isinstance(v, Decimal) else Decimal(str(v or 0))
 
-# Allowances used for net income (exclude meal allowance as per spec)
-# net = base + performance + high + low + computer - deductions
-# meal allowance is not counted toward actual take-home
-
-def _allowances_sum_net(r: SalaryRecord) -> Decimal:
-    return _D(r.high_temp_allowance) + _D(r.low_temp_allowance) + _D(r.computer_allowance) + _D(r.communication_allowance) + _D(r.comprehensive_allowance)
+# The helpers below accept a SalaryRecord, the RecordRow read in its place, or a
+# grouped sum of records; all expose the same amount attributes and stored
+# totals, and every formula is linear.
 
 # Allowances for composition/gross (include meal allowance)
 
@@ -44,26 +58,7 @@ def _gross_income_for_net_charts(r: SalaryRecord) -> Decimal:
     Excludes meal allowance and festival benefits per unified spec.
     应发 = 基本工资 + 绩效工资 + 高温补贴 + 低温补贴 + 电脑补贴 + 其他（排除：餐补、三节福利）
     """
-    return (
-        _D(r.base_salary)
-        + _D(r.performance_salary)
-        + _allowances_sum_net(r)  # excludes meal allowance
-        + _D(r.other_income)
-    )
-
-
-def _deductions_sum(r: SalaryRecord) -> Decimal:
-    return (
-        _D(r.pension_insurance)
-        + _D(r.medical_insurance)
-        + _D(r.unemployment_insurance)
-        + _D(r.critical_illness_insurance)
-        + _D(r.enterprise_annuity)
-        + _D(r.housing_fund)
-        + _D(r.other_deductions)
-        + _D(r.labor_union_fee)
-        + _D(r.performance_deduction)
-    )
+    return _D(r.total_income) - _D(r.non_cash_benefits)
 
 
 def _unified_net_income(r: SalaryRecord) -> Decimal:
@@ -71,12 +66,7 @@ def _unified_net_income(r: SalaryRecord) -> Decimal:
     net = base + performance + high + low + computer - (all deductions)
     Note: excludes meal/benefits and excludes other_income and tax.
     """
-    return _D(r.base_salary) + _D(r.performance_salary) + _allowances_sum_net(r) - _deductions_sum(r)
-
-
-def _gross_income_full(r: SalaryRecord) -> Decimal:
-    """Gross income for charts: sum of all income including non-cash and other income."""
-    return _D(r.base_salary) + _D(r.performance_salary) + _allowances_sum_full(r) + _benefits_sum(r) + _D(r.other_income)
+    return _D(r.actual_take_home) - _D(r.other_income)
 
 
 def _ym_num(y: int, m: int) -> int:
@@ -128,273 +118,228 @@ def _parse_range(range_str: str) -> (int, int):
     return (_ym_num(y1, m1), _ym_num(y2, m2))
 
 
+def _range_q(range_str: str) -> Q:
+    """Translate a range string into a (year, month) predicate evaluated by the database.
+    Bounds on year are kept as plain comparisons so SQLite can range-scan the (year, month) indexes.
+    """
+    start_num, end_num = _parse_range(range_str)
+    y1, m1 = divmod(start_num, 100)
+    y2, m2 = divmod(end_num, 100)
+    return (
+        Q(year__gte=y1, year__lte=y2)
+        & (Q(year__gt=y1) | Q(month__gte=m1))
+        & (Q(year__lt=y2) | Q(month__lte=m2))
+    )
+
+
 @router.get("/monthly", response_model=List[MonthlyStats])
+@cached_response
 async def monthly_stats(
     user= Depends(get_current_user),
+    db=Depends(read_db),
     person_id: Optional[int] = Query(default=None),
     year: Optional[int] = Query(default=None),
     month: Optional[int] = Query(default=None),
 ):
-    q = SalaryRecord.filter(person__user_id=user.id)
+    q = SalaryRecord.filter(user_id=user.id)
     if person_id:
         q = q.filter(person_id=person_id)
     if year:
         q = q.filter(year=year)
     if month:
         q = q.filter(month=month)
-    recs = await q.all()
+    # One record per (person, year, month), so each row is already that month's total
+    return _build_monthly_stats(await fetch_rows(q.order_by("person_id", "year", "month"), using_db=db))
+
+
+def _build_monthly_stats(rows) -> List[MonthlyStats]:
     result: List[MonthlyStats] = []
-    for r in recs:
-        calc = compute_payroll(
-            base_salary=r.base_salary,
-            performance_salary=r.performance_salary,
-            high_temp_allowance=r.high_temp_allowance,
-            low_temp_allowance=r.low_temp_allowance,
-            computer_allowance=r.computer_allowance,
-            meal_allowance=r.meal_allowance,
-            mid_autumn_benefit=r.mid_autumn_benefit,
-            dragon_boat_benefit=r.dragon_boat_benefit,
-            spring_festival_benefit=r.spring_festival_benefit,
-            other_income=r.other_income,
-            comprehensive_allowance=r.comprehensive_allowance,
-            pension_insurance=r.pension_insurance,
-            medical_insurance=r.medical_insurance,
-            unemployment_insurance=r.unemployment_insurance,
-            critical_illness_insurance=r.critical_illness_insurance,
-            enterprise_annuity=r.enterprise_annuity,
-            housing_fund=r.housing_fund,
-            other_deductions=r.other_deductions,
-            labor_union_fee=r.labor_union_fee,
-            performance_deduction=r.performance_deduction,
-            tax=r.tax,
-        )
+    for r in rows:
         allowances_total = r.high_temp_allowance + r.low_temp_allowance + r.computer_allowance + r.communication_allowance + r.comprehensive_allowance
         insurance_total = (r.pension_insurance + r.medical_insurance + r.unemployment_insurance +
                           r.critical_illness_insurance + r.enterprise_annuity + r.housing_fund)
         result.append(
-            MonthlyStats(
+            MonthlyStats.model_construct(
                 person_id=r.person_id,
                 year=r.year,
                 month=r.month,
-                base_salary=r.base_salary,
-                performance=r.performance_salary,
-                allowances_total=allowances_total,
+                base_salary=float(r.base_salary),
+                performance=float(r.performance_salary),
+                allowances_total=float(allowances_total),
                 bonuses_total=0.0,
-                insurance_total=insurance_total,
-                tax=calc["tax"],
-                gross_income=calc["gross_income"],
-                net_income=calc["net_income"],
-                actual_take_home=calc["actual_take_home"],
-                non_cash_benefits=calc["non_cash_benefits"],
+                insurance_total=float(insurance_total),
+                tax=float(r.tax),
+                gross_income=float(r.total_income),
+                net_income=float(r.net_income),
+                actual_take_home=float(r.actual_take_home),
+                non_cash_benefits=float(r.non_cash_benefits),
             )
         )
     return result
 
 
 @router.get("/yearly", response_model=List[YearlyStats])
-async def yearly_stats(user= Depends(get_current_user), person_id: Optional[int] = Query(default=None), year: int = Query(...)):
-    persons = await Person.filter(user_id=user.id).all()
-    person_ids = {p.id for p in persons}
-    if person_id and person_id not in person_ids:
-        raise HTTPException(status_code=404, detail="人员不存在")
+@cached_response
+async def yearly_stats(user= Depends(get_current_user), db=Depends(read_db), person_id: Optional[int] = Query(default=None), year: int = Query(...)):
+    filters = {"year": year}
     if person_id:
-        person_ids = {person_id}
-    recs = await SalaryRecord.filter(person_id__in=list(person_ids), year=year).all()
-    stats_map = {}
-    for r in recs:
-        calc = compute_payroll(
-            base_salary=r.base_salary,
-            performance_salary=r.performance_salary,
-            high_temp_allowance=r.high_temp_allowance,
-            low_temp_allowance=r.low_temp_allowance,
-            computer_allowance=r.computer_allowance,
-            meal_allowance=r.meal_allowance,
-            mid_autumn_benefit=r.mid_autumn_benefit,
-            dragon_boat_benefit=r.dragon_boat_benefit,
-            spring_festival_benefit=r.spring_festival_benefit,
-            other_income=r.other_income,
-            comprehensive_allowance=r.comprehensive_allowance,
-            pension_insurance=r.pension_insurance,
-            medical_insurance=r.medical_insurance,
-            unemployment_insurance=r.unemployment_insurance,
-            critical_illness_insurance=r.critical_illness_insurance,
-            enterprise_annuity=r.enterprise_annuity,
-            housing_fund=r.housing_fund,
-            other_deductions=r.other_deductions,
-            labor_union_fee=r.labor_union_fee,
-            performance_deduction=r.performance_deduction,
-            tax=r.tax,
-        )
+        if not await Person.exists(id=person_id, user_id=user.id, using_db=db):
+            raise HTTPException(status_code=404, detail="人员不存在")
+        filters["person_id"] = person_id
+    return _build_yearly_stats(await sum_records(user.id, ("person_id",), using_db=db, **filters), year)
+
+
+def _build_yearly_stats(rows, year: int) -> List[YearlyStats]:
+    """``rows`` hold one per-person yearly sum each (see sum_records/group_rows)."""
+    result: List[YearlyStats] = []
+    for r in rows:
         allowances_total = r.high_temp_allowance + r.low_temp_allowance + r.computer_allowance + r.communication_allowance + r.comprehensive_allowance
         bonuses_total = r.mid_autumn_benefit + r.dragon_boat_benefit + r.spring_festival_benefit + r.other_income
         insurance_total = r.pension_insurance + r.medical_insurance + r.unemployment_insurance + r.critical_illness_insurance + r.enterprise_annuity + r.housing_fund
-        
-        s = stats_map.get(r.person_id, {
-            "months": 0,
-            "gross": Decimal("0"),
-            "net": Decimal("0"),
-            "insurance": Decimal("0"),
-            "tax": Decimal("0"),
-            "allowances": Decimal("0"),
-            "bonuses": Decimal("0"),
-            "actual_take_home": Decimal("0"),
-            "non_cash_benefits": Decimal("0"),
-        })
-        s["months"] += 1
-        s["gross"] += calc["gross_income"]
-        s["net"] += calc["net_income"]
-        s["insurance"] += insurance_total
-        s["tax"] += calc["tax"]
-        s["allowances"] += allowances_total
-        s["actual_take_home"] += calc["actual_take_home"]
-        s["non_cash_benefits"] += calc["non_cash_benefits"]
-        s["bonuses"] += bonuses_total
-        stats_map[r.person_id] = s
-    result: List[YearlyStats] = []
-    for pid, s in stats_map.items():
-        avg_net = s["net"] / s["months"] if s["months"] else Decimal("0")
-        result.append(YearlyStats(
-            person_id=pid,
+        avg_net = r.net_income / r.record_count if r.record_count else Decimal("0")
+        result.append(YearlyStats.model_construct(
+            person_id=r.person_id,
             year=year,
-            months=s["months"],
-            total_gross=s["gross"],
-            total_net=s["net"],
-            avg_net=avg_net,
-            insurance_total=s["insurance"],
-            tax_total=s["tax"],
-            allowances_total=s["allowances"],
-            bonuses_total=s["bonuses"],
-            total_actual_take_home=s["actual_take_home"],
-            total_non_cash_benefits=s["non_cash_benefits"],
+            months=r.record_count,
+            total_gross=float(r.total_income),
+            total_net=float(r.net_income),
+            avg_net=float(avg_net),
+            insurance_total=float(insurance_total),
+            tax_total=float(r.tax),
+            allowances_total=float(allowances_total),
+            bonuses_total=float(bonuses_total),
+            total_actual_take_home=float(r.actual_take_home),
+            total_non_cash_benefits=float(r.non_cash_benefits),
         ))
     return result
 
 
 @router.get("/family", response_model=FamilySummary)
-async def family_summary(user= Depends(get_current_user), year: int = Query(...)):
-    persons = await Person.filter(user_id=user.id).all()
-    person_ids = [p.id for p in persons]
-    recs = await SalaryRecord.filter(person_id__in=person_ids, year=year).all()
+@cached_response
+async def family_summary(user= Depends(get_current_user), db=Depends(read_db), year: int = Query(...)):
+    person_ids = await Person.filter(user_id=user.id).using_db(db).values_list("id", flat=True)
+    rows = await sum_records(user.id, ("person_id",), using_db=db, year=year)
+    return _build_family_summary(rows, year, person_ids)
+
+
+def _build_family_summary(rows, year: int, person_ids: List[int]) -> FamilySummary:
     totals = {pid: Decimal("0") for pid in person_ids}
-    insurance_total = Decimal("0")
-    tax_total = Decimal("0")
-    total_gross = Decimal("0")
-    total_net = Decimal("0")
-    for r in recs:
-        calc = compute_payroll(
-            base_salary=r.base_salary,
-            performance_salary=r.performance_salary,
-            high_temp_allowance=r.high_temp_allowance,
-            low_temp_allowance=r.low_temp_allowance,
-            computer_allowance=r.computer_allowance,
-            meal_allowance=r.meal_allowance,
-            mid_autumn_benefit=r.mid_autumn_benefit,
-            dragon_boat_benefit=r.dragon_boat_benefit,
-            spring_festival_benefit=r.spring_festival_benefit,
-            other_income=r.other_income,
-            comprehensive_allowance=r.comprehensive_allowance,
-            pension_insurance=r.pension_insurance,
-            medical_insurance=r.medical_insurance,
-            unemployment_insurance=r.unemployment_insurance,
-            critical_illness_insurance=r.critical_illness_insurance,
-            enterprise_annuity=r.enterprise_annuity,
-            housing_fund=r.housing_fund,
-            other_deductions=r.other_deductions,
-            labor_union_fee=r.labor_union_fee,
-            performance_deduction=r.performance_deduction,
-            tax=r.tax,
-        )
+    insurance_total = tax_total = total_gross = total_net = Decimal("0")
+    for r in rows:
         insurance_calc = (r.pension_insurance + r.medical_insurance + r.unemployment_insurance +
                          r.critical_illness_insurance + r.enterprise_annuity + r.housing_fund)
-        totals[r.person_id] += calc["net_income"]
+        totals[r.person_id] += r.net_income
         insurance_total += insurance_calc
-        tax_total += calc["tax"]
-        total_gross += calc["gross_income"]
-        total_net += calc["net_income"]
-    return FamilySummary(
+        tax_total += r.tax
+        total_gross += r.total_income
+        total_net += r.net_income
+    return FamilySummary.model_construct(
         year=year,
         persons=person_ids,
-        total_gross=total_gross,
-        total_net=total_net,
-        insurance_total=insurance_total,
-        tax_total=tax_total,
-        by_person=totals,
+        total_gross=float(total_gross),
+        total_net=float(total_net),
+        insurance_total=float(insurance_total),
+        tax_total=float(tax_total),
+        by_person={pid: float(v) for pid, v in totals.items()},
     )
 
 
 @router.get("/cumulative-insurance", response_model=List[PersonCumulativeInsurance])
-async def cumulative_insurance(user=Depends(get_current_user)):
+@cached_response
+async def cumulative_insurance(user=Depends(get_current_user), db=Depends(read_db)):
     """Get cumulative insurance and housing fund for all persons"""
-    persons = await Person.filter(user_id=user.id).all()
     result: List[PersonCumulativeInsurance] = []
-    
-    for person in persons:
-        # Get all salary records for this person
-        recs = await SalaryRecord.filter(person_id=person.id).all()
-        
-        # Calculate system totals
-        pension_system = sum(r.pension_insurance for r in recs)
-        medical_system = sum(r.medical_insurance for r in recs)
-        housing_fund_system = sum(r.housing_fund for r in recs)
-        
-        # Calculate total = history + system
-        pension_total = Decimal(str(person.pension_history)) + Decimal(str(pension_system))
-        medical_total = Decimal(str(person.medical_history)) + Decimal(str(medical_system))
-        housing_fund_total = Decimal(str(person.housing_fund_history)) + Decimal(str(housing_fund_system))
-        
-        result.append(PersonCumulativeInsurance(
-            person_id=person.id,
-            person_name=person.name,
-            pension_history=person.pension_history,
-            medical_history=person.medical_history,
-            housing_fund_history=person.housing_fund_history,
-            pension_system=pension_system,
-            medical_system=medical_system,
-            housing_fund_system=housing_fund_system,
-            pension_total=pension_total,
-            medical_total=medical_total,
-            housing_fund_total=housing_fund_total,
+    for p in await _persons_with_contributions(user.id, db):
+        pension_system, medical_system, housing_fund_system = _contribution_sums_of(p, "system")
+        result.append(PersonCumulativeInsurance.model_construct(
+            person_id=p["id"],
+            person_name=p["name"],
+            pension_history=p["pension_history"],
+            medical_history=p["medical_history"],
+            housing_fund_history=p["housing_fund_history"],
+            pension_system=float(pension_system),
+            medical_system=float(medical_system),
+            housing_fund_system=float(housing_fund_system),
+            pension_total=_D(p["pension_history"]) + pension_system,
+            medical_total=_D(p["medical_history"]) + medical_system,
+            housing_fund_total=_D(p["housing_fund_history"]) + housing_fund_system,
         ))
-    
     return result
 
 
+# Contribution columns of the cumulative views, in (pension, medical, housing fund) order
+_CONTRIBUTION_FIELDS = ("pension_insurance", "medical_insurance", "housing_fund")
+
+
+def _persons_with_contributions(user_id: int, db, before: Optional[Q] = None, **filters):
+    """Persons with their history fields and contribution totals, in one grouped query.
+
+    The salary records are joined and summed per person, so the query count
+    does not grow with the household. ``<column>_system`` is the sum over all
+    months; with ``before`` (a condition on ``salary_records``),
+    ``<column>_before`` sums only the months matching it.
+    """
+    sums = {f"{f}_system": Sum(f"salary_records__{f}") for f in _CONTRIBUTION_FIELDS}
+    if before is not None:
+        sums.update({f"{f}_before": Sum(f"salary_records__{f}", _filter=before) for f in _CONTRIBUTION_FIELDS})
+    return (
+        Person.filter(user_id=user_id, **filters).using_db(db)
+        .annotate(**sums)
+        .order_by("id")
+        .values("id", "name", "pension_history", "medical_history", "housing_fund_history", *sums)
+    )
+
+
+def _contribution_sums_of(person_row: dict, suffix: str) -> tuple:
+    """(pension, medical, housing fund) sums annotated by _persons_with_contributions; persons without records sum to 0."""
+    return tuple(_D(person_row[f"{f}_{suffix}"]) for f in _CONTRIBUTION_FIELDS)
+
+
+def _contribution_sums(rows) -> tuple:
+    """In-memory counterpart of _contribution_sums_of for already loaded rows."""
+    return tuple(sum((_D(getattr(r, f)) for r in rows), Decimal("0")) for f in _CONTRIBUTION_FIELDS)
+
+
 @router.get("/benefits", response_model=List[BenefitStats])
+@cached_response
 async def benefit_stats(
     user=Depends(get_current_user),
+    db=Depends(read_db),
     person_id: Optional[int] = Query(default=None),
     year: Optional[int] = Query(default=None),
 ):
     """Get non-cash benefit statistics"""
-    q = SalaryRecord.filter(person__user_id=user.id)
+    q = SalaryRecord.filter(user_id=user.id)
     if person_id:
         q = q.filter(person_id=person_id)
     if year:
         q = q.filter(year=year)
     
-    recs = await q.all()
+    recs = await fetch_rows(q.order_by("id"), _BenefitRow, using_db=db)
     result: List[BenefitStats] = []
     
     for r in recs:
         total_benefits = (r.meal_allowance + r.mid_autumn_benefit + 
                          r.dragon_boat_benefit + r.spring_festival_benefit)
-        result.append(BenefitStats(
+        result.append(BenefitStats.model_construct(
             year=r.year,
             month=r.month,
             person_id=r.person_id,
-            meal_allowance=r.meal_allowance,
-            mid_autumn_benefit=r.mid_autumn_benefit,
-            dragon_boat_benefit=r.dragon_boat_benefit,
-            spring_festival_benefit=r.spring_festival_benefit,
-            total_benefits=total_benefits,
+            meal_allowance=float(r.meal_allowance),
+            mid_autumn_benefit=float(r.mid_autumn_benefit),
+            dragon_boat_benefit=float(r.dragon_boat_benefit),
+            spring_festival_benefit=float(r.spring_festival_benefit),
+            total_benefits=float(total_benefits),
         ))
     
     return result
 
 
 @router.get("/income-composition", response_model=List[IncomeComposition])
+@cached_response
 async def income_composition(
     user=Depends(get_current_user),
+    db=Depends(read_db),
     person_id: Optional[int] = Query(default=None),
     year: Optional[int] = Query(default=None),
     month: Optional[int] = Query(default=None),
@@ -404,36 +349,26 @@ async def income_composition(
     补贴 = 高温补贴 + 低温补贴 + 餐补 + 电脑补贴
     福利 = 中秋福利 + 端午福利 + 春节福利
     """
-    q = SalaryRecord.filter(person__user_id=user.id)
+    q = SalaryRecord.filter(user_id=user.id)
     if person_id:
         q = q.filter(person_id=person_id)
     if year:
         q = q.filter(year=year)
     if month:
         q = q.filter(month=month)
+    if range:
+        q = q.filter(_range_q(range))
     
-    recs = await q.all()
+    return _build_income_composition(await fetch_rows(q.order_by("id"), using_db=db))
 
-    # Apply range filter in Python if provided
-    def _ym(v: SalaryRecord) -> int:
-        return v.year * 100 + v.month
-    
-    if range:
-        start_num, end_num = _parse_range(range)
-        recs = [r for r in recs if start_num <= _ym(r) <= end_num]
 
+def _build_income_composition(recs) -> List[IncomeComposition]:
     result: List[IncomeComposition] = []
     
     for r in recs:
         allowances = float(_allowances_sum_full(r))
         benefits = float(_benefits_sum(r))
-        total_income = float(
-            _D(r.base_salary)
-            + _D(r.performance_salary)
-            + _D(allowances)
-            + _D(benefits)
-            + _D(r.other_income)
-        )
+        total_income = float(_D(r.total_income))
         
         # Calculate percentages (avoid division by zero)
         if total_income > 0:
@@ -449,7 +384,7 @@ async def income_composition(
             benefits_percent = 0.0
             other_percent = 0.0
         
-        result.append(IncomeComposition(
+        result.append(IncomeComposition.model_construct(
             person_id=r.person_id,
             year=r.year,
             month=r.month,
@@ -475,24 +410,26 @@ async def income_composition(
 
 
 @router.get("/net-income/monthly", response_model=List[MonthlyNetIncome])
+@cached_response
 async def net_income_monthly(
     user=Depends(get_current_user),
+    db=Depends(read_db),
     year: Optional[int] = Query(default=None),
     person_id: Optional[int] = Query(default=None),
     range: Optional[str] = Query(default=None, description="时间范围，如 2024-01..2024-12"),
 ):
     """Monthly net income series (unified calculation)."""
-    q = SalaryRecord.filter(person__user_id=user.id)
+    q = SalaryRecord.filter(user_id=user.id)
     if person_id:
         q = q.filter(person_id=person_id)
     if year:
         q = q.filter(year=year)
-    recs = await q.all()
-
     if range:
-        start_num, end_num = _parse_range(range)
-        recs = [r for r in recs if start_num <= _ym_num(r.year, r.month) <= end_num]
+        q = q.filter(_range_q(range))
+    return _build_net_income_monthly(await fetch_rows(q, using_db=db))
+
 
+def _build_net_income_monthly(recs) -> List[MonthlyNetIncome]:
     sums = {}
     for r in recs:
         key = (r.year, r.month)
@@ -500,13 +437,15 @@ async def net_income_monthly(
 
     result: List[MonthlyNetIncome] = []
     for (y, m) in sorted(sums.keys()):
-        result.append(MonthlyNetIncome(year=y, month=m, net_income=float(sums[(y, m)])))
+        result.append(MonthlyNetIncome.model_construct(year=y, month=m, net_income=float(sums[(y, m)])))
     return result
 
 
 @router.get("/gross-vs-net/monthly", response_model=List[GrossVsNetMonthly])
+@cached_response
 async def gross_vs_net_monthly(
     user=Depends(get_current_user),
+    db=Depends(read_db),
     year: Optional[int] = Query(default=None),
     person_id: Optional[int] = Query(default=None),
     range: Optional[str] = Query(default=None, description="时间范围，如 2024-01..2024-12"),
@@ -515,36 +454,37 @@ async def gross_vs_net_monthly(
     应发 = 基本工资 + 绩效工资 + 高温补贴 + 低温补贴 + 电脑补贴 + 其他（排除：餐补、三节福利）
     实际到手 = 应发 - 扣除
     """
-    q = SalaryRecord.filter(person__user_id=user.id)
+    q = SalaryRecord.filter(user_id=user.id)
     if person_id:
         q = q.filter(person_id=person_id)
     if year:
         q = q.filter(year=year)
-    recs = await q.all()
-
     if range:
-        start_num, end_num = _parse_range(range)
-        recs = [r for r in recs if start_num <= _ym_num(r.year, r.month) <= end_num]
+        q = q.filter(_range_q(range))
+    return _build_gross_vs_net_monthly(await fetch_rows(q, using_db=db))
 
+
+def _build_gross_vs_net_monthly(recs) -> List[GrossVsNetMonthly]:
     sums = {}
     for r in recs:
         key = (r.year, r.month)
         gross = _gross_income_for_net_charts(r)
-        deductions = _deductions_sum(r)
-        net = gross - deductions  # For waterfall: net = gross - deductions
+        net = gross - _D(r.total_deductions)  # For waterfall: net = gross - deductions
         prev_g, prev_n = sums.get(key, (Decimal("0"), Decimal("0")))
         sums[key] = (prev_g + gross, prev_n + net)
 
     result: List[GrossVsNetMonthly] = []
     for (y, m) in sorted(sums.keys()):
         g, n = sums[(y, m)]
-        result.append(GrossVsNetMonthly(year=y, month=m, gross_income=float(g), net_income=float(n)))
+        result.append(GrossVsNetMonthly.model_construct(year=y, month=m, gross_income=float(g), net_income=float(n)))
     return result
 
 
 @router.get("/deductions/breakdown", response_model=DeductionsBreakdown)
+@cached_response
 async def deductions_breakdown(
     user=Depends(get_current_user),
+    db=Depends(read_db),
     person_id: Optional[int] = Query(default=None),
     year: Optional[int] = Query(default=None),
     month: Optional[int] = Query(default=None),
@@ -553,19 +493,19 @@ async def deductions_breakdown(
     """Breakdown of deduction categories with monthly series and percentage share.
     支持按人员、年份、月份过滤；为兼容性保留 range，但前端已不使用。
     """
-    q = SalaryRecord.filter(person__user_id=user.id)
+    q = SalaryRecord.filter(user_id=user.id)
     if person_id:
         q = q.filter(person_id=person_id)
     if year:
         q = q.filter(year=year)
     if month:
         q = q.filter(month=month)
-    recs = await q.all()
-
     if range:
-        start_num, end_num = _parse_range(range)
-        recs = [r for r in recs if start_num <= _ym_num(r.year, r.month) <= end_num]
+        q = q.filter(_range_q(range))
+    return _build_deductions_breakdown(await fetch_rows(q, using_db=db))
+
 
+def _build_deductions_breakdown(recs) -> DeductionsBreakdown:
     # Summary totals by category
     categories = [
         ("养老保险", "pension_insurance"),
@@ -589,7 +529,7 @@ async def deductions_breakdown(
     for name, key in categories:
         amount = totals[key]
         percent = float((amount / grand_total * 100) if grand_total > 0 else 0)
-        summary.append(DeductionsBreakdownItem(category=name, amount=float(amount), percent=percent))
+        summary.append(DeductionsBreakdownItem.model_construct(category=name, amount=float(amount), percent=percent))
 
     # Monthly series
     monthly_map = {}
@@ -604,7 +544,7 @@ async def deductions_breakdown(
     for (y, m) in sorted(monthly_map.keys()):
         data = monthly_map[(y, m)]
         total = sum(data.values())
-        monthly.append(DeductionsMonthly(
+        monthly.append(DeductionsMonthly.model_construct(
             year=y,
             month=m,
             pension_insurance=float(data["pension_insurance"]),
@@ -619,54 +559,55 @@ async def deductions_breakdown(
             total=float(total),
         ))
 
-    return DeductionsBreakdown(summary=summary, monthly=monthly)
+    return DeductionsBreakdown.model_construct(summary=summary, monthly=monthly)
 
 
 @router.get("/contributions/cumulative", response_model=ContributionsCumulative)
+@cached_response
 async def contributions_cumulative(
     user=Depends(get_current_user),
+    db=Depends(read_db),
     person_id: int = Query(..., description="人员ID"),
     range: Optional[str] = Query(default=None, description="时间范围，如 2024-01..2024-12"),
 ):
     """Cumulative lines for pension/medical/housing fund, optionally seeded with history."""
-    person = await Person.get_or_none(id=person_id, user_id=user.id)
-    if not person:
+    before = None
+    if range:
+        y1, m1 = divmod(_parse_range(range)[0], 100)
+        before = Q(salary_records__year__lt=y1) | Q(salary_records__year=y1, salary_records__month__lt=m1)
+    rows = await _persons_with_contributions(user.id, db, before, id=person_id)
+    if not rows:
         raise HTTPException(status_code=404, detail="人员不存在")
+    person = rows[0]
 
-    all_recs = await SalaryRecord.filter(person_id=person_id).all()
-    all_recs.sort(key=lambda r: _ym_num(r.year, r.month))
-
+    # Only the months inside the range are read; earlier ones come in as the sums above
+    q = SalaryRecord.filter(user_id=user.id, person_id=person_id)
     if range:
-        start_num, end_num = _parse_range(range)
-    else:
-        start_num, end_num = (0, 999999)
+        q = q.filter(_range_q(range))
+    recs = await fetch_rows(q.order_by("year", "month"), _ContributionRow, using_db=db)
+    return _build_contributions_cumulative(
+        SimpleNamespace(**person),
+        recs,
+        _contribution_sums_of(person, "before") if range else _contribution_sums(()),
+        _contribution_sums_of(person, "system"),
+    )
 
-    # Base offsets include history plus any system amounts before the range start
-    base_pension = _D(person.pension_history)
-    base_medical = _D(person.medical_history)
-    base_housing = _D(person.housing_fund_history)
 
-    for r in all_recs:
-        ym = _ym_num(r.year, r.month)
-        if ym < start_num:
-            base_pension += _D(r.pension_insurance)
-            base_medical += _D(r.medical_insurance)
-            base_housing += _D(r.housing_fund)
+def _build_contributions_cumulative(person, recs, before: tuple, totals: tuple) -> ContributionsCumulative:
+    """``recs`` are the months inside the range; ``before`` and ``totals`` are the
+    (pension, medical, housing fund) sums before the range start and over all months."""
+    # Base offsets include history plus any system amounts before the range start
+    cur_p = _D(person.pension_history) + before[0]
+    cur_m = _D(person.medical_history) + before[1]
+    cur_h = _D(person.housing_fund_history) + before[2]
 
     # Iterate points inside range
     points: List[ContributionsCumulativePoint] = []
-    cur_p = base_pension
-    cur_m = base_medical
-    cur_h = base_housing
-
-    for r in all_recs:
-        ym = _ym_num(r.year, r.month)
-        if ym < start_num or ym > end_num:
-            continue
+    for r in sorted(recs, key=lambda r: _ym_num(r.year, r.month)):
         cur_p += _D(r.pension_insurance)
         cur_m += _D(r.medical_insurance)
         cur_h += _D(r.housing_fund)
-        points.append(ContributionsCumulativePoint(
+        points.append(ContributionsCumulativePoint.model_construct(
             year=r.year,
             month=r.month,
             pension_cumulative=float(cur_p),
@@ -675,11 +616,9 @@ async def contributions_cumulative(
         ))
 
     # Totals over entire dataset (history + system)
-    pension_system_total = float(sum(_D(r.pension_insurance) for r in all_recs))
-    medical_system_total = float(sum(_D(r.medical_insurance) for r in all_recs))
-    housing_system_total = float(sum(_D(r.housing_fund) for r in all_recs))
+    pension_system_total, medical_system_total, housing_system_total = (float(t) for t in totals)
 
-    return ContributionsCumulative(
+    return ContributionsCumulative.model_construct(
         person_id=person.id,
         person_name=person.name,
         pension_history=person.pension_history,
@@ -696,8 +635,10 @@ async def contributions_cumulative(
 
 
 @router.get("/tables/monthly", response_model=List[MonthlyTableRow])
+@cached_response
 async def monthly_table(
     user=Depends(get_current_user),
+    db=Depends(read_db),
     person_id: Optional[int] = Query(default=None),
     year: Optional[int] = Query(default=None),
     month: Optional[int] = Query(default=None),
@@ -706,29 +647,61 @@ async def monthly_table(
     """Monthly detail table: income items, deduction subtotal, net income (unified), benefits total, note.
     支持按人员、年份、月份过滤；为兼容性保留 range，但前端已不使用。
     """
-    q = SalaryRecord.filter(person__user_id=user.id)
+    recs = await fetch_rows(_monthly_table_query(user.id, person_id, year, month, range), using_db=db)
+
+    # Load person names
+    persons = {p.id: p.name for p in await Person.filter(user_id=user.id).using_db(db).all()}
+    return _build_monthly_table(recs, persons)
+
+
+def _monthly_table_query(user_id: int, person_id=None, year=None, month=None, range=None):
+    q = SalaryRecord.filter(user_id=user_id)
     if person_id:
         q = q.filter(person_id=person_id)
     if year:
         q = q.filter(year=year)
     if month:
         q = q.filter(month=month)
-    recs = await q.all()
-
     if range:
-        start_num, end_num = _parse_range(range)
-        recs = [r for r in recs if start_num <= _ym_num(r.year, r.month) <= end_num]
+        q = q.filter(_range_q(range))
+    return q
 
-    # Load person names
-    persons = {p.id: p.name for p in await Person.filter(user_id=user.id).all()}
 
+def _export_response(format: str, columns, chunks, filename: str, title: str) -> StreamingResponse:
+    return StreamingResponse(
+        export_stream(format, columns, chunks, title),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
+
+
+@router.get("/tables/monthly/export")
+async def export_monthly_table(
+    user=Depends(get_current_user),
+    db=Depends(read_db),
+    person_id: Optional[int] = Query(default=None),
+    year: Optional[int] = Query(default=None),
+    month: Optional[int] = Query(default=None),
+    range: Optional[str] = Query(default=None),
+    format: str = Query(default="csv", pattern="^(csv|xlsx)$"),
+):
+    """Monthly detail table as a CSV or XLSX download, streamed in record order chunk by chunk."""
+    persons = {p.id: p.name for p in await Person.filter(user_id=user.id).using_db(db).all()}
+    query = _monthly_table_query(user.id, person_id, year, month, range)
+
+    async def chunks():
+        async for recs in iter_record_chunks(query, using_db=db):
+            yield _build_monthly_table(recs, persons)
+
+    return _export_response(format, MONTHLY_TABLE_COLUMNS, chunks(), f"monthly-{year or 'all'}", "月度明细")
+
+
+def _build_monthly_table(recs, persons: dict) -> List[MonthlyTableRow]:
     rows: List[MonthlyTableRow] = []
     for r in sorted(recs, key=lambda x: (x.year, x.month, x.person_id)):
         benefits = _benefits_sum(r)
-        deductions = _deductions_sum(r)
         net = _unified_net_income(r)
-        income_total = _gross_income_full(r)
-        rows.append(MonthlyTableRow(
+        rows.append(MonthlyTableRow.model_construct(
             person_id=r.person_id,
             person_name=persons.get(r.person_id, str(r.person_id)),
             year=r.year,
@@ -757,8 +730,8 @@ async def monthly_table(
             labor_union_fee=float(_D(r.labor_union_fee)),
             performance_deduction=float(_D(r.performance_deduction)),
             # totals
-            income_total=float(income_total),
-            deductions_total=float(deductions),
+            income_total=float(_D(r.total_income)),
+            deductions_total=float(_D(r.total_deductions)),
             benefits_total=float(benefits),
             allowances_total=float(_D(r.meal_allowance) + _D(r.other_income)),
             actual_take_home=float(net),
@@ -771,122 +744,93 @@ async def monthly_table(
 
 
 @router.get("/tables/annual", response_model=List[AnnualTableRow])
+@cached_response
 async def annual_table(
     user=Depends(get_current_user),
+    db=Depends(read_db),
     year: int = Query(...),
 ):
     """Annual summary table per person with YoY growth based on unified net income."""
-    persons = await Person.filter(user_id=user.id).all()
-    person_ids = [p.id for p in persons]
+    persons = await Person.filter(user_id=user.id).using_db(db).all()
     name_map = {p.id: p.name for p in persons}
 
-    recs = await SalaryRecord.filter(person_id__in=person_ids, year=year).all()
+    # Per-person sums for the current and previous year, grouped in SQL
+    rows_cur = await sum_records(user.id, ("person_id",), using_db=db, year=year)
+    rows_prev = await sum_records(user.id, ("person_id",), using_db=db, year=year - 1)
+    return _build_annual_table(rows_cur, rows_prev, year, name_map)
+
+
+@router.get("/tables/annual/export")
+async def export_annual_table(
+    user=Depends(get_current_user),
+    db=Depends(read_db),
+    year: Optional[int] = Query(default=None, description="Omit to export every year"),
+    format: str = Query(default="csv", pattern="^(csv|xlsx)$"),
+):
+    """Annual summary table as a CSV or XLSX download, one grouped query per exported year."""
+    name_map = {p.id: p.name for p in await Person.filter(user_id=user.id).using_db(db).all()}
+    if year:
+        years = [year]
+    else:
+        years = await (
+            SalaryRecord.filter(user_id=user.id).using_db(db)
+            .distinct().order_by("year").values_list("year", flat=True)
+        )
+
+    async def chunks():
+        prev_year, rows_prev = None, []
+        for y in years:
+            if prev_year != y - 1:
+                rows_prev = await sum_records(user.id, ("person_id",), using_db=db, year=y - 1)
+            rows_cur = await sum_records(user.id, ("person_id",), using_db=db, year=y)
+            yield _build_annual_table(rows_cur, rows_prev, y, name_map)
+            prev_year, rows_prev = y, rows_cur
+
+    return _export_response(format, ANNUAL_TABLE_COLUMNS, chunks(), f"annual-{year or 'all'}", "年度汇总")
 
-    # Current year aggregates across all fixed fields
-    agg = {}
-    for r in recs:
-        pid = r.person_id
-        cur = agg.get(pid, {
-            # income items
-            "base_salary": Decimal("0"),
-            "performance_salary": Decimal("0"),
-            "high_temp_allowance": Decimal("0"),
-            "low_temp_allowance": Decimal("0"),
-            "computer_allowance": Decimal("0"),
-            "communication_allowance": Decimal("0"),
-            "meal_allowance": Decimal("0"),
-            "mid_autumn_benefit": Decimal("0"),
-            "dragon_boat_benefit": Decimal("0"),
-            "spring_festival_benefit": Decimal("0"),
-            "other_income": Decimal("0"),
-            # deduction items
-            "pension_insurance": Decimal("0"),
-            "medical_insurance": Decimal("0"),
-            "unemployment_insurance": Decimal("0"),
-            "critical_illness_insurance": Decimal("0"),
-            "enterprise_annuity": Decimal("0"),
-            "housing_fund": Decimal("0"),
-            "other_deductions": Decimal("0"),
-            "labor_union_fee": Decimal("0"),
-            # derived totals
-            "income_total": Decimal("0"),
-            "deductions_total": Decimal("0"),
-            "benefits_total": Decimal("0"),
-            "actual_take_home_total": Decimal("0"),
-            "net": Decimal("0"),
-        })
-        # accumulate incomes
-        cur["base_salary"] += _D(r.base_salary)
-        cur["performance_salary"] += _D(r.performance_salary)
-        cur["high_temp_allowance"] += _D(r.high_temp_allowance)
-        cur["low_temp_allowance"] += _D(r.low_temp_allowance)
-        cur["computer_allowance"] += _D(r.computer_allowance)
-        cur["communication_allowance"] += _D(r.communication_allowance)
-        cur["meal_allowance"] += _D(r.meal_allowance)
-        cur["mid_autumn_benefit"] += _D(r.mid_autumn_benefit)
-        cur["dragon_boat_benefit"] += _D(r.dragon_boat_benefit)
-        cur["spring_festival_benefit"] += _D(r.spring_festival_benefit)
-        cur["other_income"] += _D(r.other_income)
-        # accumulate deductions
-        cur["pension_insurance"] += _D(r.pension_insurance)
-        cur["medical_insurance"] += _D(r.medical_insurance)
-        cur["unemployment_insurance"] += _D(r.unemployment_insurance)
-        cur["critical_illness_insurance"] += _D(r.critical_illness_insurance)
-        cur["enterprise_annuity"] += _D(r.enterprise_annuity)
-        cur["housing_fund"] += _D(r.housing_fund)
-        cur["other_deductions"] += _D(r.other_deductions)
-        cur["labor_union_fee"] += _D(r.labor_union_fee)
-        # derived
-        cur["income_total"] += _gross_income_full(r)
-        cur["deductions_total"] += _deductions_sum(r)
-        b_total = _benefits_sum(r)
-        cur["benefits_total"] += b_total
-        n = _unified_net_income(r)
-        cur["actual_take_home_total"] += n
-        cur["net"] += n
-        agg[pid] = cur
 
+def _build_annual_table(rows_cur, rows_prev, year: int, name_map: dict) -> List[AnnualTableRow]:
     # Previous year nets for YoY
-    prev_recs = await SalaryRecord.filter(person_id__in=person_ids, year=year - 1).all()
-    prev_net = {}
-    for r in prev_recs:
-        prev_net[r.person_id] = prev_net.get(r.person_id, Decimal("0")) + _unified_net_income(r)
+    prev_net = {r.person_id: _unified_net_income(r) for r in rows_prev}
 
     rows: List[AnnualTableRow] = []
-    for pid, cur in agg.items():
+    for r in rows_cur:
+        pid = r.person_id
+        net = _unified_net_income(r)
         pn = prev_net.get(pid, Decimal("0"))
-        yoy = float(((cur["net"] - pn) / pn * 100)) if pn > 0 else None
-        rows.append(AnnualTableRow(
+        yoy = float(((net - pn) / pn * 100)) if pn > 0 else None
+        rows.append(AnnualTableRow.model_construct(
             person_id=pid,
             person_name=name_map.get(pid, str(pid)),
             year=year,
             # income totals
-            base_salary_total=float(cur["base_salary"]),
-            performance_salary_total=float(cur["performance_salary"]),
-            high_temp_allowance_total=float(cur["high_temp_allowance"]),
-            low_temp_allowance_total=float(cur["low_temp_allowance"]),
-            computer_allowance_total=float(cur["computer_allowance"]),
-            communication_allowance_total=float(cur["communication_allowance"]),
-            meal_allowance_total=float(cur["meal_allowance"]),
-            mid_autumn_benefit_total=float(cur["mid_autumn_benefit"]),
-            dragon_boat_benefit_total=float(cur["dragon_boat_benefit"]),
-            spring_festival_benefit_total=float(cur["spring_festival_benefit"]),
-            other_income_total=float(cur["other_income"]),
+            base_salary_total=float(r.base_salary),
+            performance_salary_total=float(r.performance_salary),
+            high_temp_allowance_total=float(r.high_temp_allowance),
+            low_temp_allowance_total=float(r.low_temp_allowance),
+            computer_allowance_total=float(r.computer_allowance),
+            communication_allowance_total=float(r.communication_allowance),
+            comprehensive_allowance_total=float(r.comprehensive_allowance),
+            meal_allowance_total=float(r.meal_allowance),
+            mid_autumn_benefit_total=float(r.mid_autumn_benefit),
+            dragon_boat_benefit_total=float(r.dragon_boat_benefit),
+            spring_festival_benefit_total=float(r.spring_festival_benefit),
+            other_income_total=float(r.other_income),
             # deduction totals
-            pension_insurance_total=float(cur["pension_insurance"]),
-            medical_insurance_total=float(cur["medical_insurance"]),
-            unemployment_insurance_total=float(cur["unemployment_insurance"]),
-            critical_illness_insurance_total=float(cur["critical_illness_insurance"]),
-            enterprise_annuity_total=float(cur["enterprise_annuity"]),
-            housing_fund_total=float(cur["housing_fund"]),
-            other_deductions_total=float(cur["other_deductions"]),
-            labor_union_fee_total=float(cur["labor_union_fee"]),
-            performance_deduction_total=float(cur["performance_deduction"]) if "performance_deduction" in cur else 0.0,
+            pension_insurance_total=float(r.pension_insurance),
+            medical_insurance_total=float(r.medical_insurance),
+            unemployment_insurance_total=float(r.unemployment_insurance),
+            critical_illness_insurance_total=float(r.critical_illness_insurance),
+            enterprise_annuity_total=float(r.enterprise_annuity),
+            housing_fund_total=float(r.housing_fund),
+            other_deductions_total=float(r.other_deductions),
+            labor_union_fee_total=float(r.labor_union_fee),
+            performance_deduction_total=float(r.performance_deduction),
             # grand totals
-            income_total=float(cur["income_total"]),
-            deductions_total=float(cur["deductions_total"]),
-            benefits_total=float(cur["benefits_total"]),
-            actual_take_home_total=float(cur["actual_take_home_total"]),
+            income_total=float(r.total_income),
+            deductions_total=float(r.total_deductions),
+            benefits_total=float(_benefits_sum(r)),
+            actual_take_home_total=float(net),
             yoy_growth=yoy,
         ))
 
@@ -896,8 +840,10 @@ async def annual_table(
 
 
 @router.get("/tables/annual-monthly", response_model=List[AnnualMonthlyRow])
+@cached_response
 async def annual_monthly_table(
     user=Depends(get_current_user),
+    db=Depends(read_db),
     year: int = Query(...),
     person_id: Optional[int] = Query(default=None),
     hide_empty: bool = Query(default=False, description="Hide months with no data"),
@@ -906,123 +852,166 @@ async def annual_monthly_table(
     Shows all fixed fields summed across all persons (or filtered person) for each month.
     If hide_empty=true, only returns months with actual data.
     """
-    persons = await Person.filter(user_id=user.id).all()
-    person_ids = [p.id for p in persons]
-    
+    filters = {"year": year}
     if person_id:
-        if person_id not in person_ids:
+        if not await Person.exists(id=person_id, user_id=user.id, using_db=db):
             raise HTTPException(status_code=404, detail="人员不存在")
-        person_ids = [person_id]
-    
-    recs = await SalaryRecord.filter(person_id__in=person_ids, year=year).all()
-    
-    # Aggregate by month (1-12)
-    monthly_agg = {}
-    for m in range(1, 13):
-        monthly_agg[m] = {
-            "base_salary": Decimal("0"),
-            "performance_salary": Decimal("0"),
-            "high_temp_allowance": Decimal("0"),
-            "low_temp_allowance": Decimal("0"),
-            "computer_allowance": Decimal("0"),
-            "communication_allowance": Decimal("0"),
-            "comprehensive_allowance": Decimal("0"),
-            "meal_allowance": Decimal("0"),
-            "mid_autumn_benefit": Decimal("0"),
-            "dragon_boat_benefit": Decimal("0"),
-            "spring_festival_benefit": Decimal("0"),
-            "other_income": Decimal("0"),
-            "pension_insurance": Decimal("0"),
-            "medical_insurance": Decimal("0"),
-            "unemployment_insurance": Decimal("0"),
-            "critical_illness_insurance": Decimal("0"),
-            "enterprise_annuity": Decimal("0"),
-            "housing_fund": Decimal("0"),
-            "other_deductions": Decimal("0"),
-            "labor_union_fee": Decimal("0"),
-            "performance_deduction": Decimal("0"),
-            "income_total": Decimal("0"),
-            "deductions_total": Decimal("0"),
-            "benefits_total": Decimal("0"),
-            "actual_take_home": Decimal("0"),
-        }
-    
-    for r in recs:
-        m = r.month
-        agg = monthly_agg[m]
-        
-        # Accumulate income fields
-        agg["base_salary"] += _D(r.base_salary)
-        agg["performance_salary"] += _D(r.performance_salary)
-        agg["high_temp_allowance"] += _D(r.high_temp_allowance)
-        agg["low_temp_allowance"] += _D(r.low_temp_allowance)
-        agg["computer_allowance"] += _D(r.computer_allowance)
-        agg["communication_allowance"] += _D(r.communication_allowance)
-        agg["comprehensive_allowance"] += _D(r.comprehensive_allowance)
-        agg["meal_allowance"] += _D(r.meal_allowance)
-        agg["mid_autumn_benefit"] += _D(r.mid_autumn_benefit)
-        agg["dragon_boat_benefit"] += _D(r.dragon_boat_benefit)
-        agg["spring_festival_benefit"] += _D(r.spring_festival_benefit)
-        agg["other_income"] += _D(r.other_income)
-        
-        # Accumulate deduction fields
-        agg["pension_insurance"] += _D(r.pension_insurance)
-        agg["medical_insurance"] += _D(r.medical_insurance)
-        agg["unemployment_insurance"] += _D(r.unemployment_insurance)
-        agg["critical_illness_insurance"] += _D(r.critical_illness_insurance)
-        agg["enterprise_annuity"] += _D(r.enterprise_annuity)
-        agg["housing_fund"] += _D(r.housing_fund)
-        agg["other_deductions"] += _D(r.other_deductions)
-        agg["labor_union_fee"] += _D(r.labor_union_fee)
-        agg["performance_deduction"] += _D(r.performance_deduction)
-        
-        # Calculate totals
-        agg["income_total"] += _gross_income_full(r)
-        agg["deductions_total"] += _deductions_sum(r)
-        agg["benefits_total"] += _benefits_sum(r)
-        agg["allowances_total"] = agg.get("allowances_total", Decimal("0")) + (_D(r.meal_allowance) + _D(r.other_income))
-        agg["actual_take_home"] += _unified_net_income(r)
-    
-    def is_empty(agg):
-        """Check if a month's aggregation is empty (all zeros)."""
-        return all(agg[k] == Decimal("0") for k in agg.keys())
-    
+        filters["person_id"] = person_id
+
+    # Month sums across persons, grouped in SQL
+    return _build_annual_monthly_table(await sum_records(user.id, ("month",), using_db=db, **filters), hide_empty)
+
+
+def _build_annual_monthly_table(month_rows, hide_empty: bool) -> List[AnnualMonthlyRow]:
+    by_month = {r.month: r for r in month_rows}
+
     rows: List[AnnualMonthlyRow] = []
     for m in range(1, 13):
-        agg = monthly_agg[m]
-        
-        # Skip empty months if hide_empty is true
-        if hide_empty and is_empty(agg):
+        r = by_month.get(m)
+        if r is None:
+            # Skip empty months if hide_empty is true
+            if hide_empty:
+                continue
+            r = SimpleNamespace(**{f: Decimal("0") for f in MONEY_FIELDS})
+        elif hide_empty and all(getattr(r, f) == Decimal("0") for f in AMOUNT_FIELDS if f != "tax"):
             continue
-            
-        rows.append(AnnualMonthlyRow(
+
+        rows.append(AnnualMonthlyRow.model_construct(
             month=m,
-            base_salary=float(agg["base_salary"]),
-            performance_salary=float(agg["performance_salary"]),
-            high_temp_allowance=float(agg["high_temp_allowance"]),
-            low_temp_allowance=float(agg["low_temp_allowance"]),
-            computer_allowance=float(agg["computer_allowance"]),
-            communication_allowance=float(agg["communication_allowance"]),
-            comprehensive_allowance=float(agg["comprehensive_allowance"]) if "comprehensive_allowance" in agg else 0.0,
-            meal_allowance=float(agg["meal_allowance"]),
-            mid_autumn_benefit=float(agg["mid_autumn_benefit"]),
-            dragon_boat_benefit=float(agg["dragon_boat_benefit"]),
-            spring_festival_benefit=float(agg["spring_festival_benefit"]),
-            other_income=float(agg["other_income"]),
-            pension_insurance=float(agg["pension_insurance"]),
-            medical_insurance=float(agg["medical_insurance"]),
-            unemployment_insurance=float(agg["unemployment_insurance"]),
-            critical_illness_insurance=float(agg["critical_illness_insurance"]),
-            enterprise_annuity=float(agg["enterprise_annuity"]),
-            housing_fund=float(agg["housing_fund"]),
-            other_deductions=float(agg["other_deductions"]),
-            labor_union_fee=float(agg["labor_union_fee"]),
-            performance_deduction=float(agg["performance_deduction"]) if "performance_deduction" in agg else 0.0,
-            income_total=float(agg["income_total"]),
-            deductions_total=float(agg["deductions_total"]),
-            benefits_total=float(agg["benefits_total"]),
-            allowances_total=float(agg.get("allowances_total", Decimal("0"))),
-            actual_take_home=float(agg["actual_take_home"]),
+            base_salary=float(r.base_salary),
+            performance_salary=float(r.performance_salary),
+            high_temp_allowance=float(r.high_temp_allowance),
+            low_temp_allowance=float(r.low_temp_allowance),
+            computer_allowance=float(r.computer_allowance),
+            communication_allowance=float(r.communication_allowance),
+            comprehensive_allowance=float(r.comprehensive_allowance),
+            meal_allowance=float(r.meal_allowance),
+            mid_autumn_benefit=float(r.mid_autumn_benefit),
+            dragon_boat_benefit=float(r.dragon_boat_benefit),
+            spring_festival_benefit=float(r.spring_festival_benefit),
+            other_income=float(r.other_income),
+            pension_insurance=float(r.pension_insurance),
+            medical_insurance=float(r.medical_insurance),
+            unemployment_insurance=float(r.unemployment_insurance),
+            critical_illness_insurance=float(r.critical_illness_insurance),
+            enterprise_annuity=float(r.enterprise_annuity),
+            housing_fund=float(r.housing_fund),
+            other_deductions=float(r.other_deductions),
+            labor_union_fee=float(r.labor_union_fee),
+            performance_deduction=float(r.performance_deduction),
+            income_total=float(r.total_income),
+            deductions_total=float(r.total_deductions),
+            benefits_total=float(_benefits_sum(r)),
+            allowances_total=float(_D(r.meal_allowance) + _D(r.other_income)),
+            actual_take_home=float(_unified_net_income(r)),
         ))
-    
+
     return rows
+
+
+# Dashboard panels and the filters each one honours, mirroring the standalone endpoints
+_DASHBOARD_PANELS = {
+    "monthly": ("person_id", "year", "month"),
+    "yearly": ("person_id", "year"),
+    "family": ("year",),
+    "net_income_monthly": ("person_id", "year", "range"),
+    "gross_vs_net_monthly": ("person_id", "year", "range"),
+    "income_composition": ("person_id", "year", "month", "range"),
+    "deductions_breakdown": ("person_id", "year", "month", "range"),
+    "contributions_cumulative": ("person_id", "range"),
+    "table_monthly": ("person_id", "year", "month", "range"),
+    "table_annual": ("year",),
+    "table_annual_monthly": ("person_id", "year"),
+}
+_YEAR_PANELS = {"yearly", "family", "table_annual", "table_annual_monthly"}
+
+
+def _select(recs, person_id=None, year=None, month=None, range=None) -> list:
+    """Filter already loaded records the same way the endpoints filter in the database."""
+    if range:
+        start_num, end_num = _parse_range(range)
+    return [
+        r for r in recs
+        if (not person_id or r.person_id == person_id)
+        and (not year or r.year == year)
+        and (not month or r.month == month)
+        and (not range or start_num <= _ym_num(r.year, r.month) <= end_num)
+    ]
+
+
+@router.get("/dashboard", response_model=StatsDashboard)
+@cached_response
+async def dashboard(
+    user=Depends(get_current_user),
+    db=Depends(read_db),
+    person_id: Optional[int] = Query(default=None),
+    year: Optional[int] = Query(default=None),
+    month: Optional[int] = Query(default=None),
+    range: Optional[str] = Query(default=None, description="时间范围，如 2024-01..2024-12"),
+    hide_empty: bool = Query(default=False, description="table_annual_monthly: hide months with no data"),
+    panels: Optional[List[str]] = Query(default=None, description="面板列表，可重复或逗号分隔；默认返回当前过滤条件可用的全部面板"),
+):
+    """Several stats panels in one request, computed from a single salary scan.
+    Each panel matches the corresponding standalone endpoint for the same filters.
+    """
+    if panels:
+        wanted = [p.strip() for item in panels for p in item.split(",") if p.strip()]
+        unknown = [p for p in wanted if p not in _DASHBOARD_PANELS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"未知面板: {', '.join(unknown)}")
+        if not year and _YEAR_PANELS.intersection(wanted):
+            raise HTTPException(status_code=400, detail="所选面板需要年份")
+        if not person_id and "contributions_cumulative" in wanted:
+            raise HTTPException(status_code=400, detail="累计曲线需要人员")
+    else:
+        wanted = [
+            p for p in _DASHBOARD_PANELS
+            if (year or p not in _YEAR_PANELS) and (person_id or p != "contributions_cumulative")
+        ]
+
+    persons = await Person.filter(user_id=user.id).using_db(db).all()
+    person = next((p for p in persons if p.id == person_id), None)
+    if person_id and person is None:
+        raise HTTPException(status_code=404, detail="人员不存在")
+
+    # One scan wide enough for every requested panel; panels then narrow it in memory
+    q = SalaryRecord.filter(user_id=user.id)
+    if person_id and all("person_id" in _DASHBOARD_PANELS[p] for p in wanted):
+        q = q.filter(person_id=person_id)
+    if year and "contributions_cumulative" not in wanted:
+        # Every other panel honours year; the annual table also needs the previous year for YoY
+        q = q.filter(year__in=[year, year - 1] if "table_annual" in wanted else [year])
+    recs = await fetch_rows(q.order_by("id"), using_db=db)
+
+    filters = {"person_id": person_id, "year": year, "month": month, "range": range}
+    names = {p.id: p.name for p in persons}
+    out = {}
+    for panel in wanted:
+        sel = _select(recs, **{k: filters[k] for k in _DASHBOARD_PANELS[panel]})
+        if panel == "monthly":
+            out[panel] = _build_monthly_stats(group_rows(sel, ("person_id", "year", "month")))
+        elif panel == "yearly":
+            out[panel] = _build_yearly_stats(group_rows(sel, ("person_id",)), year)
+        elif panel == "family":
+            out[panel] = _build_family_summary(group_rows(sel, ("person_id",)), year, [p.id for p in persons])
+        elif panel == "net_income_monthly":
+            out[panel] = _build_net_income_monthly(sel)
+        elif panel == "gross_vs_net_monthly":
+            out[panel] = _build_gross_vs_net_monthly(sel)
+        elif panel == "income_composition":
+            out[panel] = _build_income_composition(sel)
+        elif panel == "deductions_breakdown":
+            out[panel] = _build_deductions_breakdown(sel)
+        elif panel == "contributions_cumulative":
+            mine = _select(recs, person_id=person_id)
+            start_num = _parse_range(range)[0] if range else 0
+            before = _contribution_sums([r for r in mine if _ym_num(r.year, r.month) < start_num])
+            out[panel] = _build_contributions_cumulative(person, _select(mine, range=range), before, _contribution_sums(mine))
+        elif panel == "table_monthly":
+            out[panel] = _build_monthly_table(sel, names)
+        elif panel == "table_annual":
+            prev = _select(recs, year=year - 1)
+            out[panel] = _build_annual_table(group_rows(sel, ("person_id",)), group_rows(prev, ("person_id",)), year, names)
+        elif panel == "table_annual_monthly":
+            out[panel] = _build_annual_monthly_table(group_rows(sel, ("month",)), hide_empty)
+    return StatsDashboard.model_construct(**out)
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
 
 
@@ -89,3 +89,43 @@ class SalaryOut(BaseModel):
     actual_take_home: float
     non_cash_benefits: float
     note: Optional[str] = None
+
+
+class SalaryImportError(BaseModel):
+    row: int
+    error: str
+
+
+class SalaryImportResult(BaseModel):
+    created: int
+    updated: int
+    errors: List[SalaryImportError]
+
+
+class SalaryBatchCreate(SalaryCreate):
+    person_id: int
+
+
+class SalaryBatchUpdate(SalaryUpdate):
+    id: int
+
+
+class SalaryBatchRequest(BaseModel):
+    create: List[SalaryBatchCreate] = []
+    update: List[SalaryBatchUpdate] = []
+    delete: List[int] = []
+
+
+class SalaryBatchItemResult(BaseModel):
+    op: str  # create / update / delete
+    index: int  # position in the request's list for op
+    id: Optional[int] = None
+    record: Optional[SalaryOut] = None
+    error: Optional[str] = None
+
+
+class SalaryBatchResult(BaseModel):
+    created: int
+    updated: int
+    deleted: int
+    results: List[SalaryBatchItemResult]
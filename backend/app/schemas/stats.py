@@ -259,3 +259,18 @@ class AnnualMonthlyRow(BaseModel):
     benefits_total: float
     allowances_total: float
     actual_take_home: float
+
+
+class StatsDashboard(BaseModel):
+    """Several stats panels computed from one scan; panels that were not requested stay null."""
+    monthly: Optional[List[MonthlyStats]] = None
+    yearly: Optional[List[YearlyStats]] = None
+    family: Optional[FamilySummary] = None
+    net_income_monthly: Optional[List[MonthlyNetIncome]] = None
+    gross_vs_net_monthly: Optional[List[GrossVsNetMonthly]] = None
+    income_composition: Optional[List[IncomeComposition]] = None
+    deductions_breakdown: Optional[DeductionsBreakdown] = None
+    contributions_cumulative: Optional[ContributionsCumulative] = None
+    table_monthly: Optional[List[MonthlyTableRow]] = None
+    table_annual: Optional[List[AnnualTableRow]] = None
+    table_annual_monthly: Optional[List[AnnualMonthlyRow]] = None
@@ -0,0 +1,131 @@
+"""In-process LRU cache for stats responses.
+
+Entries are keyed by (user_id, data_version, endpoint, parsed query params).
+Every salary or person write bumps ``users.data_version`` in the same
+transaction, so a user's old entries stop matching at once, in every worker,
+without having to find and delete them; the LRU bound evicts them later.
+The cache is bounded by the total size of the bodies (STATS_CACHE_BYTES) and,
+secondarily, by their number (STATS_CACHE_SIZE).
+"""
+import functools
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from fastapi import Depends, HTTPException, Request, Response
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.expressions import F
+
+from ..models import User
+from .metrics import record_cache
+from ..utils.auth import get_current_user, invalidate_cached_user
+from ..utils.serialization import dumps
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from config import STATS_CACHE_BYTES, STATS_CACHE_SIZE
+
+
+class ResponseCache:
+    def __init__(self, maxsize: int, maxbytes: int):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self._data: "OrderedDict[Hashable, bytes]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        body = self._data.get(key)
+        if body is not None:
+            self._data.move_to_end(key)
+        return body
+
+    def set(self, key: Hashable, body: bytes) -> None:
+        # A body over the whole budget would only evict everything else
+        if self.maxsize <= 0 or len(body) > self.maxbytes:
+            return
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.nbytes -= len(old)
+        self._data[key] = body
+        self.nbytes += len(body)
+        while self.nbytes > self.maxbytes or len(self._data) > self.maxsize:
+            _, evicted = self._data.popitem(last=False)
+            self.nbytes -= len(evicted)
+
+    def invalidate_user(self, user_id: int) -> None:
+        for key in [k for k in self._data if k[0] == user_id]:
+            self.nbytes -= len(self._data.pop(key))
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+stats_cache = ResponseCache(STATS_CACHE_SIZE, STATS_CACHE_BYTES)
+
+
+async def bump_data_version(user_id: int, using_db: Optional[BaseDBAsyncClient] = None) -> None:
+    """Mark the user's data as changed; call inside the transaction of the write."""
+    await User.filter(id=user_id).using_db(using_db).update(data_version=F("data_version") + 1)
+    # Cached users carry the old version; other workers notice the commit via PRAGMA data_version
+    invalidate_cached_user(user_id)
+    # Stale entries can no longer be hit; drop this worker's copies now instead of waiting for LRU
+    stats_cache.invalidate_user(user_id)
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def cached_response(endpoint: Callable) -> Callable:
+    """Serve a stats endpoint from ``stats_cache``.
+
+    The endpoint must take ``user`` as a keyword argument and may take ``db``
+    (its read connection). The remaining arguments are the parsed query
+    params, so equivalent query strings (order, defaults) share one entry. The cached value is the encoded JSON
+    body, returned as-is on a hit without running or re-validating anything. On a miss the result is
+    encoded with orjson as built; the response_model is not applied to it.
+    """
+    @functools.wraps(endpoint)
+    async def wrapper(*, user, **kwargs):
+        params = tuple(sorted((k, _freeze(v)) for k, v in kwargs.items() if k != "db"))
+        key = (user.id, user.data_version, endpoint.__name__, params)
+        body = stats_cache.get(key)
+        record_cache("stats", body is not None)
+        if body is None:
+            result = await endpoint(user=user, **kwargs)
+            body = dumps(result)
+            stats_cache.set(key, body)
+        return Response(content=body, media_type="application/json")
+
+    return wrapper
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # Weak comparison (RFC 9110 8.8.3.2): the W/ prefix is ignored on both sides
+    if header.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in header.split(","))
+
+
+async def conditional_get(request: Request, user=Depends(get_current_user)) -> None:
+    """Dependency for GET routes whose response only depends on the user's data.
+
+    The ETag is derived from the user's data_version. A matching If-None-Match
+    ends the request with 304 before the endpoint runs; otherwise the tag is
+    left on request.state for the middleware in create_app to send.
+    """
+    etag = f'W/"{user.id}-{user.data_version}"'
+    request.state.etag = etag
+    header = request.headers.get("if-none-match")
+    if header:
+        matched = _etag_matches(header, etag)
+        record_cache("etag", matched)
+        if matched:
+            raise HTTPException(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,159 @@
+"""SQLite connection settings and background maintenance.
+
+Tortoise's SQLite client runs every extra connection credential as a PRAGMA,
+in order, when it opens the connection, so the tuning profile from config is
+passed as credentials. Each worker process holds one writer connection, used
+by the ORM by default, and a pool of read-only connections that the stats
+endpoints pass to their queries. The busy timeout makes workers queue for the
+write lock instead of failing.
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import sys
+from typing import AsyncIterator, Iterator, List, Optional
+
+from tortoise import connections
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.backends.sqlite import SqliteClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from config import DB_PATH, SQLITE_PROFILE, SQLITE_PRAGMAS, SQLITE_MAINTENANCE_INTERVAL, SQLITE_VACUUM_PAGES, READ_POOL_SIZE
+
+
+logger = logging.getLogger(__name__)
+
+
+def _credentials() -> dict:
+    credentials = {"file_path": DB_PATH}
+    if SQLITE_PROFILE == "tuned":
+        credentials.update(SQLITE_PRAGMAS)
+    return credentials
+
+
+def tortoise_config(models: List[str]) -> dict:
+    """Tortoise config for the app database. A URL would not do: its query
+    parameters are applied after Tortoise's defaults, and auto_vacuum must
+    come before journal_mode."""
+    return {
+        "connections": {"default": {"engine": "tortoise.backends.sqlite", "credentials": _credentials()}},
+        "apps": {"models": {"models": models, "default_connection": "default"}},
+    }
+
+
+class ReadPool:
+    """Read-only SQLite connections beside Tortoise's writer connection.
+
+    aiosqlite gives every connection its own thread, and in WAL mode readers
+    do not block each other or the writer, so queries on different pool
+    connections run in parallel. The connections are not registered with
+    Tortoise (``in_transaction()`` requires a single connection); callers
+    check one out with ``connection()`` and pass it with ``using_db``.
+    ``query_only`` makes an accidental write fail.
+
+    One more connection of the same kind serves only ``data_version``, so the
+    check never queues behind a write or a long stats query.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._clients: List[SqliteClient] = []
+        self._version_client: Optional[SqliteClient] = None
+        # Checkouts currently holding each client, by index into _clients
+        self._in_use: List[int] = []
+        self._next = 0
+
+    async def open(self) -> None:
+        credentials = _credentials()
+        file_path = credentials.pop("file_path")
+        for i in range(self.size):
+            client = SqliteClient(file_path, connection_name=f"read_{i}", **credentials, query_only="ON")
+            await client.create_connection(with_db=True)
+            self._clients.append(client)
+            self._in_use.append(0)
+        if self.size > 0:
+            self._version_client = SqliteClient(file_path, connection_name="read_version", **credentials, query_only="ON")
+            await self._version_client.create_connection(with_db=True)
+
+    async def close(self) -> None:
+        clients, self._clients = self._clients, []
+        self._in_use = []
+        if self._version_client is not None:
+            clients.append(self._version_client)
+            self._version_client = None
+        for client in clients:
+            await client.close()
+
+    async def data_version(self) -> int:
+        """SQLite's PRAGMA data_version, which changes whenever another connection
+        (another worker's, or this worker's writer) commits; from the writer when there is no pool."""
+        client = self._version_client or connections.get("default")
+        _, rows = await client.execute_query("PRAGMA data_version")
+        return rows[0][0]
+
+    @contextlib.contextmanager
+    def connection(self) -> Iterator[BaseDBAsyncClient]:
+        """Check out a connection: one no other checkout holds if there is one,
+        else the least shared, taking turns among equals; the writer when the
+        pool is empty. Never waits, since an aiosqlite connection queues its
+        own queries."""
+        if not self._clients:
+            yield connections.get("default")
+            return
+        n = len(self._clients)
+        i = min(range(n), key=lambda i: (self._in_use[i], (i - self._next) % n))
+        self._next = (i + 1) % n
+        self._in_use[i] += 1
+        try:
+            yield self._clients[i]
+        finally:
+            # The pool may have been closed and reopened meanwhile
+            if i < len(self._in_use):
+                self._in_use[i] -= 1
+
+
+read_pool = ReadPool(READ_POOL_SIZE)
+
+
+async def read_db() -> AsyncIterator[BaseDBAsyncClient]:
+    """Dependency for read-only endpoints: the connection to run the request's queries on,
+    checked out until the endpoint has returned."""
+    with read_pool.connection() as client:
+        yield client
+
+
+async def run_maintenance() -> None:
+    """Refresh planner statistics and return free pages to the file system.
+
+    ``PRAGMA optimize`` re-analyzes only the tables whose statistics are stale;
+    a database that was never analyzed gets a full ANALYZE first. The
+    incremental vacuum is a no-op unless the file uses auto_vacuum=INCREMENTAL.
+    """
+    conn = connections.get("default")
+    _, rows = await conn.execute_query("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+    if not rows:
+        await conn.execute_query("ANALYZE")
+    await conn.execute_query("PRAGMA optimize")
+
+    _, rows = await conn.execute_query("PRAGMA auto_vacuum")
+    if rows[0][0] == 2:
+        _, rows = await conn.execute_query("PRAGMA freelist_count")
+        if rows[0][0]:
+            await conn.execute_query(f"PRAGMA incremental_vacuum({SQLITE_VACUUM_PAGES})")
+
+
+async def _maintenance_loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_maintenance()
+        except Exception:
+            # A busy database or a closing connection must not end the loop
+            logger.exception("SQLite maintenance failed")
+
+
+def start_maintenance() -> Optional[asyncio.Task]:
+    if SQLITE_MAINTENANCE_INTERVAL <= 0:
+        return None
+    return asyncio.create_task(_maintenance_loop(SQLITE_MAINTENANCE_INTERVAL))
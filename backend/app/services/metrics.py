@@ -0,0 +1,170 @@
+"""Prometheus metrics, served on /api/metrics.
+
+- ``salarium_http_request_duration_seconds{method,route}``: latency histogram
+  per route template (``/api/salaries/{record_id}``, not the raw path;
+  requests that match no route are labelled ``unmatched``).
+- ``salarium_http_requests_total{method,route,status}`` and
+  ``salarium_http_request_errors_total{method,route}`` (5xx and unhandled
+  exceptions).
+- ``salarium_db_query_duration_seconds{operation}``: every SQL statement,
+  through the query hooks, by its first keyword.
+- ``salarium_cache_lookups_total{cache,result}``: hits and misses of the
+  stats response cache, the auth token cache and ETag revalidation. The hit
+  ratio is ``rate(...{result="hit"}) / rate(...)``; counters, unlike a
+  ratio, add up across workers.
+- ``salarium_event_loop_lag_seconds``: how late a periodic sleep wakes up,
+  i.e. how long the loop was blocked by synchronous work.
+- ``salarium_password_hash_jobs{state}`` (``queued``, ``running``) and
+  ``salarium_password_hash_slots``: bcrypt work on the password thread pools,
+  summed over the live workers; queued jobs mean logins wait for a slot.
+
+uvicorn's workers are separate processes with their own memory, and a scrape
+reaches only one of them. prometheus_client's multiprocess mode keeps each
+worker's values in memory-mapped files in PROMETHEUS_MULTIPROC_DIR and sums
+them on every scrape, so any worker answers for all. The directory must be
+set before prometheus_client is imported, hence this module's first lines:
+when it is not configured and the process is a worker of a supervisor
+(``uvicorn --workers N``), a directory named after the supervisor's pid and
+start time is used, so the workers of one server share it and a later server
+that reuses the pid does not. The worker that creates it also removes the
+directories of servers that are no longer running. A single process keeps
+its metrics in memory, plus the default process and GC collectors.
+
+The endpoint itself is restricted, see ``app.routes.metrics``.
+"""
+import asyncio
+import glob
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Optional
+
+_DIR_PREFIX = os.path.join(tempfile.gettempdir(), "salarium-metrics-")
+
+
+def _process_start(pid: int) -> str:
+    """Start time of process ``pid`` in clock ticks after boot; "" if it is not running or /proc is unavailable."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Fields after the parenthesised command name; starttime is field 22 of the line
+            return f.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return ""
+
+
+def _clear_stale_dirs() -> None:
+    """Remove the metrics directories of servers that are no longer running."""
+    if not _process_start(os.getpid()):
+        return  # no /proc: a running server cannot be told from a dead one
+    for path in glob.glob(_DIR_PREFIX + "*"):
+        pid, _, start = path[len(_DIR_PREFIX):].partition("-")
+        if pid.isdigit() and (not start or _process_start(int(pid)) != start):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ and multiprocessing.parent_process() is not None:
+    _server = multiprocessing.parent_process().pid
+    _dir = f"{_DIR_PREFIX}{_server}-{_process_start(_server)}"
+    try:
+        os.makedirs(_dir)
+    except FileExistsError:
+        pass
+    else:
+        # The server's first worker clears up after earlier ones
+        _clear_stale_dirs()
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = _dir
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+from .query_hooks import add_query_listener
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from config import METRICS_ENABLED, EVENT_LOOP_LAG_INTERVAL
+
+
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+REQUEST_DURATION = Histogram(
+    "salarium_http_request_duration_seconds", "HTTP request latency", ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS = Counter("salarium_http_requests_total", "HTTP requests", ["method", "route", "status"])
+REQUEST_ERRORS = Counter("salarium_http_request_errors_total", "HTTP requests that failed with a 5xx", ["method", "route"])
+QUERY_DURATION = Histogram(
+    "salarium_db_query_duration_seconds", "SQL statement duration, including the wait for the connection", ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+CACHE_LOOKUPS = Counter("salarium_cache_lookups_total", "Cache lookups", ["cache", "result"])
+EVENT_LOOP_LAG = Histogram(
+    "salarium_event_loop_lag_seconds", "Delay of a periodic timer on the event loop",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+PASSWORD_JOBS = Gauge(
+    "salarium_password_hash_jobs", "Password hashing jobs waiting for or holding a slot", ["state"],
+    multiprocess_mode="livesum",
+)
+PASSWORD_SLOTS = Gauge("salarium_password_hash_slots", "Password hashing slots", multiprocess_mode="livesum")
+
+_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "PRAGMA", "BEGIN", "COMMIT", "ROLLBACK", "WITH"}
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_password_job(state: str, change: int) -> None:
+    PASSWORD_JOBS.labels(state).inc(change)
+
+
+def _observe_query(sql: str, values, seconds: float) -> None:
+    keyword = sql.lstrip()[:8].split(None, 1)[0].upper() if sql.strip() else ""
+    QUERY_DURATION.labels(keyword if keyword in _OPERATIONS else "OTHER").observe(seconds)
+
+
+async def track_request(request, call_next):
+    """HTTP middleware: latency and outcome of the request under its route template."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = getattr(request.scope.get("route"), "path", None) or "unmatched"
+        method = request.method
+        REQUEST_DURATION.labels(method, route).observe(time.perf_counter() - start)
+        REQUESTS.labels(method, route, str(status)).inc()
+        if status >= 500:
+            REQUEST_ERRORS.labels(method, route).inc()
+
+
+def render() -> bytes:
+    """Exposition of every worker's metrics in the Prometheus text format."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+async def _event_loop_monitor(interval: float) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - start - interval))
+
+
+def start_event_loop_monitor() -> Optional[asyncio.Task]:
+    if not METRICS_ENABLED or EVENT_LOOP_LAG_INTERVAL <= 0:
+        return None
+    return asyncio.create_task(_event_loop_monitor(EVENT_LOOP_LAG_INTERVAL))
+
+
+if METRICS_ENABLED:
+    add_query_listener(_observe_query)
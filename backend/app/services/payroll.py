@@ -1,6 +1,13 @@
 from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, Iterable, Mapping
 
+import numpy as np
 
+from ..models.salary_record import AMOUNT_FIELDS, TOTAL_FIELDS
+from .profiling import timed
+
+
+@timed("payroll")
 def compute_payroll(
     *,
     base_salary,
@@ -115,3 +122,89 @@ def compute_payroll(
         "actual_take_home": actual_take_home,
         "non_cash_benefits": non_cash_benefits,
     }
+
+
+_CASH_INCOME = (
+    "base_salary",
+    "performance_salary",
+    "high_temp_allowance",
+    "low_temp_allowance",
+    "computer_allowance",
+    "communication_allowance",
+    "comprehensive_allowance",
+    "other_income",
+)
+_NON_CASH = ("meal_allowance", "mid_autumn_benefit", "dragon_boat_benefit", "spring_festival_benefit")
+_DEDUCTIONS = (
+    "pension_insurance",
+    "medical_insurance",
+    "unemployment_insurance",
+    "critical_illness_insurance",
+    "enterprise_annuity",
+    "housing_fund",
+    "other_deductions",
+    "labor_union_fee",
+    "performance_deduction",
+)
+
+
+def to_cents(values: Iterable[Any]) -> np.ndarray:
+    """Convert money values (Decimal, float, str or None) to an int64 array of cents.
+
+    Each value is rounded to the cent with ROUND_HALF_UP. Stored amounts are
+    already whole cents, so for them the conversion is exact.
+    """
+    q = Decimal("0.01")
+    return np.fromiter(
+        (
+            int((v if isinstance(v, Decimal) else Decimal(str(v or 0))).quantize(q, rounding=ROUND_HALF_UP).scaleb(2))
+            for v in values
+        ),
+        dtype=np.int64,
+    )
+
+
+@timed("payroll")
+def compute_payroll_batch(columns: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+    """Vectorized compute_payroll over many records at once.
+
+    ``columns`` maps every name in AMOUNT_FIELDS (the keyword arguments of
+    compute_payroll) to a sequence of integer cents (a dict of NumPy arrays
+    or a pandas DataFrame both work). Returns the same keys as
+    compute_payroll, each an int64 array of cents. Sums of whole cents need
+    no rounding, so the results equal the scalar ROUND_HALF_UP results
+    exactly.
+    """
+    cols = {f: np.asarray(columns[f], dtype=np.int64) for f in AMOUNT_FIELDS}
+
+    cash_income = sum(cols[f] for f in _CASH_INCOME)
+    non_cash_benefits = sum(cols[f] for f in _NON_CASH)
+    total_income = cash_income + non_cash_benefits
+    total_deductions = sum(cols[f] for f in _DEDUCTIONS)
+    tax = cols["tax"]
+
+    return {
+        "total_income": total_income,
+        "total_deductions": total_deductions,
+        "gross_income": total_income,
+        "tax": tax,
+        "net_income": total_income - total_deductions - tax,
+        "actual_take_home": cash_income - total_deductions,
+        "non_cash_benefits": non_cash_benefits,
+    }
+
+
+@timed("payroll")
+def set_totals(records: Iterable[Any]) -> None:
+    """Assign the stored totals (TOTAL_FIELDS) of each record from its current amounts.
+
+    Call before saving records in bulk; single saves can take the totals from
+    their compute_payroll result instead.
+    """
+    records = list(records)
+    if not records:
+        return
+    calc = compute_payroll_batch({f: to_cents(getattr(r, f) for r in records) for f in AMOUNT_FIELDS})
+    for f in TOTAL_FIELDS:
+        for rec, cents in zip(records, calc[f].tolist()):
+            setattr(rec, f, Decimal(cents).scaleb(-2))
@@ -0,0 +1,55 @@
+"""Listeners on every statement sent to SQLite.
+
+Tortoise has no query events, so the execute methods of its SQLite client are
+wrapped the first time a listener is added; the transaction wrapper overrides
+``execute_many`` and is wrapped as well. ORM queries, raw queries and the
+read pool's queries all pass through them. Each listener is called with the
+SQL text, its parameters (None when they are inlined, as Tortoise does for
+selects) and the elapsed seconds, including the wait for the connection. With
+no listener nothing is wrapped and queries run exactly as before.
+"""
+import functools
+import time
+from typing import Callable, List, Optional, Sequence
+
+from tortoise.backends.sqlite.client import SqliteClient, TransactionWrapper
+
+QueryListener = Callable[[str, Optional[Sequence], float], None]
+
+_METHODS = {
+    SqliteClient: ("execute_insert", "execute_many", "execute_query", "execute_query_dict", "execute_script"),
+    TransactionWrapper: ("execute_many",),
+}
+_listeners: List[QueryListener] = []
+_installed = False
+
+
+def _timed(method):
+    @functools.wraps(method)
+    async def wrapper(client, query, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await method(client, query, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            values = args[0] if args else kwargs.get("values")
+            for listener in _listeners:
+                listener(query, values, elapsed)
+
+    return wrapper
+
+
+def _install() -> None:
+    global _installed
+    if _installed:
+        return
+    for cls, names in _METHODS.items():
+        for name in names:
+            setattr(cls, name, _timed(cls.__dict__[name]))
+    _installed = True
+
+
+def add_query_listener(listener: QueryListener) -> None:
+    _install()
+    if listener not in _listeners:
+        _listeners.append(listener)
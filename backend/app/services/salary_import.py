@@ -0,0 +1,103 @@
+"""Parsing of uploaded salary spreadsheets for the bulk import endpoint.
+
+Rows are streamed: CSV through the csv module and XLSX through openpyxl's
+read-only mode, so memory stays flat however many years a file covers. The
+first row is the header; columns are the SalaryCreate field names plus
+``person_id`` or ``person_name`` to pick the person.
+"""
+import csv
+import io
+import os
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+
+import openpyxl
+from pydantic import ValidationError
+
+from ..models import Person
+from ..models.fields import to_amount
+from ..models.salary_record import AMOUNT_FIELDS
+from ..schemas.salary import SalaryCreate
+
+
+# Rows validated per step; also the bulk insert batch size
+IMPORT_BATCH_SIZE = 500
+
+
+def iter_sheet_rows(file: IO[bytes], filename: Optional[str]) -> Iterator[Tuple[int, Dict[str, object]]]:
+    """Yield (row number, {header: value}) for each non-empty data row; empty cells are left out."""
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext == ".csv":
+        text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        try:
+            yield from _rows_with_header(csv.reader(text))
+        finally:
+            # Leave the upload's file open for its owner
+            text.detach()
+    elif ext == ".xlsx":
+        wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+        try:
+            yield from _rows_with_header(wb.active.iter_rows(values_only=True))
+        finally:
+            wb.close()
+    else:
+        raise ValueError("仅支持 CSV 或 XLSX 文件")
+
+
+def _blank(v: object) -> bool:
+    return v is None or (isinstance(v, str) and not v.strip())
+
+
+def _rows_with_header(rows) -> Iterator[Tuple[int, Dict[str, object]]]:
+    header: Optional[List[str]] = None
+    for n, values in enumerate(rows, start=1):
+        if header is None:
+            header = ["" if _blank(v) else str(v).strip().lower() for v in values]
+            continue
+        if all(_blank(v) for v in values):
+            continue
+        yield n, {h: v for h, v in zip(header, values) if h and not _blank(v)}
+
+
+def _person_id(values: Dict[str, object], persons: List[Person], default_person_id: Optional[int]) -> int:
+    if "person_id" in values:
+        try:
+            pid = int(values["person_id"])
+        except (TypeError, ValueError):
+            raise ValueError(f"person_id 无效: {values['person_id']}")
+        if not any(p.id == pid for p in persons):
+            raise ValueError(f"人员不存在: {pid}")
+        return pid
+    name = values.get("person_name")
+    if name is not None:
+        matches = [p.id for p in persons if p.name == str(name).strip()]
+        if not matches:
+            raise ValueError(f"人员不存在: {name}")
+        if len(matches) > 1:
+            raise ValueError(f"人员名称重复，请改用 person_id: {name}")
+        return matches[0]
+    if default_person_id is None:
+        raise ValueError("缺少 person_id 或 person_name")
+    return default_person_id
+
+
+def parse_salary_row(
+    values: Dict[str, object],
+    persons: List[Person],
+    default_person_id: Optional[int] = None,
+) -> Tuple[int, dict]:
+    """Validate one sheet row. Returns (person_id, SalaryRecord field values) or raises ValueError."""
+    pid = _person_id(values, persons, default_person_id)
+    if "note" in values:
+        # Spreadsheet cells may hold numbers or dates
+        values = {**values, "note": str(values["note"])}
+    try:
+        payload = SalaryCreate(**values)
+    except ValidationError as e:
+        err = e.errors()[0]
+        raise ValueError(f"{'.'.join(str(x) for x in err['loc'])}: {err['msg']}")
+    if not 1 <= payload.month <= 12:
+        raise ValueError(f"month 无效: {payload.month}")
+
+    fields = {f: to_amount(getattr(payload, f)) for f in AMOUNT_FIELDS}
+    fields.update(year=payload.year, month=payload.month, note=payload.note)
+    return pid, fields
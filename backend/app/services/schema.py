@@ -0,0 +1,254 @@
+"""Schema and index management for the SQLite database.
+
+Tortoise's safe schema generation creates missing tables and the indexes
+declared in each model's ``Meta.indexes``, but it never alters an existing
+table. Column changes are applied here first, as idempotent steps that inspect
+the live schema, so existing SQLite files and fresh installs end up with the
+same layout.
+"""
+import logging
+import re
+import sqlite3
+from decimal import Decimal
+
+from tortoise import connections
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.utils import get_schema_sql
+
+from ..models.fields import CENTS_STORAGE, CENTS_SQL_TYPE, DECIMAL_SQL_TYPE, decimal_to_cents
+from ..models.salary_record import AMOUNT_FIELDS, MONEY_FIELDS, TOTAL_FIELDS
+from .payroll import compute_payroll_batch
+
+
+logger = logging.getLogger(__name__)
+
+
+async def _table_exists(conn: BaseDBAsyncClient, table: str) -> bool:
+    _, rows = await conn.execute_query(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", [table]
+    )
+    return bool(rows)
+
+
+async def _columns(conn: BaseDBAsyncClient, table: str) -> dict:
+    _, rows = await conn.execute_query(f'PRAGMA table_info("{table}")')
+    return {r["name"]: r for r in rows}
+
+
+async def _add_salary_record_user_id(conn: BaseDBAsyncClient) -> None:
+    """Denormalize persons.user_id onto salary_records so stats queries skip the join."""
+    if not await _table_exists(conn, "salary_records"):
+        return
+    if "user_id" in await _columns(conn, "salary_records"):
+        return
+    logger.info("Adding salary_records.user_id")
+    await conn.execute_query(
+        'ALTER TABLE "salary_records" ADD COLUMN "user_id" INT REFERENCES "users" ("id") ON DELETE CASCADE'
+    )
+    await conn.execute_query(
+        'UPDATE "salary_records" SET "user_id" = '
+        '(SELECT "user_id" FROM "persons" WHERE "persons"."id" = "salary_records"."person_id")'
+    )
+
+
+async def _add_user_data_version(conn: BaseDBAsyncClient) -> None:
+    """Per-user write generation used to key cached stats responses."""
+    if not await _table_exists(conn, "users"):
+        return
+    if "data_version" in await _columns(conn, "users"):
+        return
+    logger.info("Adding users.data_version")
+    await conn.execute_query('ALTER TABLE "users" ADD COLUMN "data_version" INT NOT NULL DEFAULT 0')
+
+
+# Indexes replaced by a wider one in the model Meta; the new index is created by schema generation
+_SUPERSEDED_INDEXES = {
+    "salary_records": [("user_id", "year", "month")],
+}
+
+
+async def _drop_superseded_indexes(conn: BaseDBAsyncClient) -> None:
+    """Drop indexes that a model no longer declares, matched by their column list."""
+    for table, superseded in _SUPERSEDED_INDEXES.items():
+        if not await _table_exists(conn, table):
+            continue
+        _, indexes = await conn.execute_query(f'PRAGMA index_list("{table}")')
+        for idx in indexes:
+            if idx["origin"] != "c":
+                continue
+            _, cols = await conn.execute_query(f'PRAGMA index_info("{idx["name"]}")')
+            if tuple(c["name"] for c in cols) in superseded:
+                logger.info("Dropping index %s", idx["name"])
+                await conn.execute_query(f'DROP INDEX "{idx["name"]}"')
+
+
+def _cents_to_decimal(value) -> str:
+    return format(Decimal(int(value)).scaleb(-2), "f")
+
+
+async def _rebuild_amount_columns(conn: BaseDBAsyncClient, table: str) -> None:
+    """Switch the money columns of ``table`` to the configured AMOUNT_STORAGE type.
+
+    SQLite cannot change a column type in place, so the table is recreated from
+    its own DDL with the new type, rows are copied with their amounts converted
+    exactly, and the original is replaced. Indexes go with the old table and are
+    recreated by the schema generation that runs after the migrations.
+    """
+    if not await _table_exists(conn, table):
+        return
+    target = CENTS_SQL_TYPE if CENTS_STORAGE else DECIMAL_SQL_TYPE
+    current = (await _columns(conn, table))["base_salary"]["type"]
+    if current.upper() == target:
+        return
+    logger.info("Converting %s amounts from %s to %s", table, current, target)
+    convert = decimal_to_cents if CENTS_STORAGE else _cents_to_decimal
+
+    _, rows = await conn.execute_query("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", [table])
+    ddl = rows[0]["sql"]
+    new_table = f"{table}__rebuild"
+    ddl = ddl.replace(f'CREATE TABLE "{table}"', f'CREATE TABLE "{new_table}"', 1)
+    for f in MONEY_FIELDS:
+        ddl = re.sub(rf'"{f}" {re.escape(current)}', f'"{f}" {target}', ddl, count=1)
+    await conn.execute_query(ddl)
+
+    columns = list(await _columns(conn, table))
+    amounts = {i for i, c in enumerate(columns) if c in MONEY_FIELDS}
+    column_list = ", ".join(f'"{c}"' for c in columns)
+    row_sql = "(" + ", ".join("?" for _ in columns) + ")"
+    _, rows = await conn.execute_query(f'SELECT {column_list} FROM "{table}"')
+    # Multi-row INSERTs in chunks that stay under SQLite's 999 bound-parameter limit;
+    # execute_many would open a second transaction inside the migration one
+    chunk = max(1, 999 // len(columns))
+    for start in range(0, len(rows), chunk):
+        batch = rows[start:start + chunk]
+        await conn.execute_query(
+            f'INSERT INTO "{new_table}" ({column_list}) VALUES ' + ", ".join(row_sql for _ in batch),
+            [convert(v) if i in amounts else v for r in batch for i, v in enumerate(tuple(r))],
+        )
+
+    # Keep AUTOINCREMENT from reusing ids of rows deleted before the rebuild
+    _, seq = await conn.execute_query("SELECT seq FROM sqlite_sequence WHERE name = ?", [table])
+    await conn.execute_query(f'DROP TABLE "{table}"')
+    await conn.execute_query(f'ALTER TABLE "{new_table}" RENAME TO "{table}"')
+    if seq:
+        await conn.execute_query(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", [seq[0]["seq"], table]
+        )
+
+
+async def _convert_salary_amounts(conn: BaseDBAsyncClient) -> None:
+    """Store salary amounts as configured by AMOUNT_STORAGE (decimal text or integer cents)."""
+    await _rebuild_amount_columns(conn, "salary_records")
+
+
+async def _add_total_columns(conn: BaseDBAsyncClient, table: str) -> None:
+    """Add the derived total columns to ``table`` and fill them from each row's amounts.
+
+    The amounts are read raw and the totals computed in integer cents, as
+    compute_payroll_batch does for the application, then written back through
+    a temporary table in one UPDATE.
+    """
+    if not await _table_exists(conn, table):
+        return
+    columns = await _columns(conn, table)
+    if "total_income" in columns:
+        return
+    logger.info("Adding derived totals to %s", table)
+    sql_type = columns["base_salary"]["type"]
+    for f in TOTAL_FIELDS:
+        await conn.execute_query(f'ALTER TABLE "{table}" ADD COLUMN "{f}" {sql_type} NOT NULL DEFAULT 0')
+
+    to_cents = int if CENTS_STORAGE else decimal_to_cents
+    to_stored = int if CENTS_STORAGE else _cents_to_decimal
+    column_list = ", ".join(f'"{f}"' for f in AMOUNT_FIELDS)
+    _, rows = await conn.execute_query(f'SELECT "id", {column_list} FROM "{table}"')
+    if not rows:
+        return
+    calc = compute_payroll_batch({f: [to_cents(r[f]) for r in rows] for f in AMOUNT_FIELDS})
+    totals = [
+        (r["id"], *map(to_stored, values))
+        for r, values in zip(rows, zip(*(calc[f].tolist() for f in TOTAL_FIELDS)))
+    ]
+
+    await conn.execute_query(
+        'CREATE TEMP TABLE "_salary_totals" ("id" INTEGER PRIMARY KEY, '
+        + ", ".join(f'"{f}"' for f in TOTAL_FIELDS) + ")"
+    )
+    row_sql = "(" + ", ".join("?" for _ in range(len(TOTAL_FIELDS) + 1)) + ")"
+    chunk = 999 // (len(TOTAL_FIELDS) + 1)
+    for start in range(0, len(totals), chunk):
+        batch = totals[start:start + chunk]
+        await conn.execute_query(
+            'INSERT INTO "_salary_totals" VALUES ' + ", ".join(row_sql for _ in batch),
+            [v for row in batch for v in row],
+        )
+    total_list = ", ".join(f'"{f}"' for f in TOTAL_FIELDS)
+    await conn.execute_query(
+        f'UPDATE "{table}" SET ({total_list}) = '
+        f'(SELECT {total_list} FROM "_salary_totals" t WHERE t."id" = "{table}"."id")'
+    )
+    await conn.execute_query('DROP TABLE "_salary_totals"')
+
+
+async def _add_salary_totals(conn: BaseDBAsyncClient) -> None:
+    """Store the payroll totals so listings and stats read and SUM them instead of recomputing."""
+    await _add_total_columns(conn, "salary_records")
+
+
+async def _drop_monthly_aggregates(conn: BaseDBAsyncClient) -> None:
+    """The per-month aggregate table had the grain of salary_records; stats now sum the records' stored totals."""
+    if not await _table_exists(conn, "salary_monthly_aggregates"):
+        return
+    logger.info("Dropping salary_monthly_aggregates")
+    await conn.execute_query('DROP TABLE "salary_monthly_aggregates"')
+
+
+# How long a starting worker waits for another worker's migration to finish
+MIGRATION_LOCK_TIMEOUT_MS = 60000
+
+# Applied in order on every startup; each step must be a no-op when already applied
+MIGRATIONS = (
+    _add_salary_record_user_id,
+    _convert_salary_amounts,
+    _add_user_data_version,
+    _drop_superseded_indexes,
+    _add_salary_totals,
+    _drop_monthly_aggregates,
+)
+
+
+async def _create_missing_tables(conn: BaseDBAsyncClient) -> None:
+    """Tortoise's safe schema generation (CREATE ... IF NOT EXISTS for every table
+    and index), run statement by statement so it stays in the migration transaction."""
+    statement = ""
+    for line in get_schema_sql(conn, safe=True).splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            await conn.execute_query(statement)
+            statement = ""
+
+
+async def migrate(conn: BaseDBAsyncClient) -> None:
+    # BEGIN IMMEDIATE takes the write lock up front so concurrent workers apply steps one at a time;
+    # the busy timeout makes the others wait for it, then find nothing left to do.
+    # execute_query is used throughout because executescript would commit the open transaction.
+    _, rows = await conn.execute_query("PRAGMA busy_timeout")
+    busy_timeout = rows[0][0]
+    await conn.execute_query(f"PRAGMA busy_timeout = {max(busy_timeout, MIGRATION_LOCK_TIMEOUT_MS)}")
+    try:
+        await conn.execute_query("BEGIN IMMEDIATE")
+        try:
+            for step in MIGRATIONS:
+                await step(conn)
+            await _create_missing_tables(conn)
+        except Exception:
+            await conn.execute_query("ROLLBACK")
+            raise
+        await conn.execute_query("COMMIT")
+    finally:
+        await conn.execute_query(f"PRAGMA busy_timeout = {busy_timeout}")
+
+
+async def prepare_database() -> None:
+    """Migrate existing tables and create missing ones, all under one write lock."""
+    await migrate(connections.get("default"))
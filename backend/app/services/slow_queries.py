@@ -0,0 +1,130 @@
+"""Slow query log.
+
+Every SQL statement slower than SLOW_QUERY_MS is logged at WARNING with its
+duration, the route of the request that issued it, the SQL text and its
+parameters (Tortoise inlines the values of selects into the text, so their
+parameter list is empty):
+
+    slow query duration_ms=412.7 route="GET /api/stats/monthly" sql="SELECT ..." params=null
+
+With SLOW_QUERY_EXPLAIN on, ``EXPLAIN QUERY PLAN`` of the statement is added
+as ``plan="SEARCH salary_records USING INDEX ...; ..."``, and a plan step
+that reads a whole table, such as ``SCAN salary_records``, is named in
+``full_scan=``. The plan is fetched after the statement, on a read
+connection, so the statement itself is not delayed; plans are remembered per
+SQL text, so a statement that is slow again is not explained again.
+
+The route comes from the request scope, which the ``remember_request``
+middleware puts in a context variable; statements outside a request (startup,
+maintenance) have no route.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import re
+import sys
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+
+from .database import read_pool
+from .query_hooks import add_query_listener
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from config import SLOW_QUERY_MS, SLOW_QUERY_EXPLAIN
+
+
+logger = logging.getLogger(__name__)
+
+MAX_SQL_CHARS = 4000
+PLAN_CACHE_SIZE = 256
+_FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+_request_scope: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("request_scope", default=None)
+_plans: "OrderedDict[str, List[str]]" = OrderedDict()
+# Strong references to the pending EXPLAIN tasks, which the loop only holds weakly
+_pending: set = set()
+
+
+async def remember_request(request, call_next):
+    """HTTP middleware: make the request's scope, and so its route, visible to the query log."""
+    token = _request_scope.set(request.scope)
+    try:
+        return await call_next(request)
+    finally:
+        _request_scope.reset(token)
+
+
+def _current_route() -> Optional[str]:
+    scope = _request_scope.get()
+    if scope is None:
+        return None
+    route = getattr(scope.get("route"), "path", None) or scope.get("path")
+    return f"{scope.get('method')} {route}"
+
+
+def _clip(text: str) -> str:
+    return text if len(text) <= MAX_SQL_CHARS else text[:MAX_SQL_CHARS] + "..."
+
+
+async def explain(sql: str, values: Optional[Sequence] = None) -> List[str]:
+    """The steps of the statement's query plan, in SQLite's order."""
+    with read_pool.connection() as client:
+        _, rows = await client.execute_query(f"EXPLAIN QUERY PLAN {sql}", list(values or ()))
+    return [row[3] for row in rows]
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    """Tables the plan reads in full, without an index."""
+    return [m.group(1) for m in map(_FULL_SCAN.match, plan) if m]
+
+
+def _log(sql: str, values, ms: float, route: Optional[str], plan: Optional[List[str]] = None) -> None:
+    fields = {
+        "duration_ms": round(ms, 1),
+        "route": route,
+        "sql": _clip(" ".join(sql.split())),
+        "params": _clip(repr(list(values))) if values else None,
+    }
+    if plan is not None:
+        fields["plan"] = "; ".join(plan)
+        scans = full_scans(plan)
+        if scans:
+            fields["full_scan"] = ",".join(scans)
+    text = " ".join(f"{k}={json.dumps(v, ensure_ascii=False)}" for k, v in fields.items())
+    logger.warning("slow query %s", text, extra={"slow_query": fields})
+
+
+async def _explain_and_log(sql: str, values, ms: float, route: Optional[str]) -> None:
+    plan = _plans.get(sql)
+    if plan is None:
+        try:
+            plan = await explain(sql, values)
+        except Exception as exc:
+            plan = [f"EXPLAIN failed: {exc}"]
+        _plans[sql] = plan
+        while len(_plans) > PLAN_CACHE_SIZE:
+            _plans.popitem(last=False)
+    else:
+        _plans.move_to_end(sql)
+    _log(sql, values, ms, route, plan)
+
+
+def _on_query(sql: str, values, seconds: float) -> None:
+    ms = seconds * 1000
+    keyword = sql.lstrip()[:7].upper()
+    # Never the log's own EXPLAIN
+    if ms < SLOW_QUERY_MS or keyword == "EXPLAIN":
+        return
+    route = _current_route()
+    if SLOW_QUERY_EXPLAIN and keyword.startswith(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")):
+        task = asyncio.get_running_loop().create_task(_explain_and_log(sql, values, ms, route))
+        _pending.add(task)
+        task.add_done_callback(_pending.discard)
+    else:
+        _log(sql, values, ms, route)
+
+
+if SLOW_QUERY_MS > 0:
+    add_query_listener(_on_query)
@@ -0,0 +1,150 @@
+from collections import namedtuple
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import AsyncIterator, Iterable, List, Optional, Sequence, Type
+
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.expressions import Q
+from tortoise.functions import Count, Sum
+from tortoise.queryset import QuerySet
+
+from ..models import SalaryRecord
+from ..models.salary_record import MONEY_FIELDS
+
+
+# Rows read by the stats scans. They expose the same attributes as the model
+# instances they replace, so the builders take either.
+RecordRow = namedtuple("RecordRow", ("id", "person_id", "year", "month", *MONEY_FIELDS, "note"))
+
+
+class _ValueCache(dict):
+    """Python value per stored value of one column. Amounts repeat a lot
+    (zeros, the same salary every month), so equal values share one Decimal."""
+
+    def __init__(self, to_python) -> None:
+        super().__init__()
+        self.to_python = to_python
+
+    def __missing__(self, raw):
+        value = self[raw] = self.to_python(raw)
+        return value
+
+
+async def fetch_rows(
+    query: QuerySet,
+    row_type: Type[tuple] = RecordRow,
+    using_db: Optional[BaseDBAsyncClient] = None,
+) -> list:
+    """Run ``query`` on ``using_db`` (the model's default connection when None)
+    for the columns of ``row_type`` and return one ``row_type`` per row.
+
+    A stats scan only reads attributes, so full model instances are not
+    needed: the rows come straight from the cursor, and the amount columns are
+    converted column by column with their field's own conversion (text or
+    cents, see AMOUNT_STORAGE).
+    """
+    db = using_db or query.model._meta.db
+    _, rows = await db.execute_query(query.using_db(db).values_list(*row_type._fields).sql())
+    if not rows:
+        return []
+    fields_map = query.model._meta.fields_map
+    columns = [
+        list(map(_ValueCache(fields_map[name].to_python_value).__getitem__, col)) if name in MONEY_FIELDS else col
+        for name, col in zip(row_type._fields, zip(*rows))
+    ]
+    return list(map(row_type._make, zip(*columns)))
+
+
+async def sum_records(
+    user_id: int,
+    group_by: Sequence[str],
+    using_db: Optional[BaseDBAsyncClient] = None,
+    **filters,
+) -> List[SimpleNamespace]:
+    """SUM every money column of the salary records, grouped in SQL.
+
+    ``group_by`` is a subset of ``("person_id", "year", "month")`` and ``filters``
+    are regular Tortoise filter kwargs. Each returned row exposes the group
+    columns, ``record_count`` and one attribute per money column (the stored
+    totals included), so it can be passed to the same helpers as a SalaryRecord.
+    """
+    annotations = {f"sum_{f}": Sum(f) for f in MONEY_FIELDS}
+    rows = await (
+        SalaryRecord.filter(user_id=user_id, **filters)
+        .using_db(using_db)
+        .annotate(**annotations, record_count=Count("id"))
+        .group_by(*group_by)
+        .order_by(*group_by)
+        .values(*group_by, *annotations, "record_count")
+    )
+    result: List[SimpleNamespace] = []
+    for row in rows:
+        values = {f: row[f"sum_{f}"] or Decimal("0") for f in MONEY_FIELDS}
+        result.append(SimpleNamespace(
+            **{g: row[g] for g in group_by},
+            record_count=row["record_count"],
+            **values,
+        ))
+    return result
+
+
+def group_rows(rows: Iterable, group_by: Sequence[str]) -> List[SimpleNamespace]:
+    """In-memory counterpart of ``sum_records`` for rows that are already loaded.
+
+    Accepts SalaryRecords (each counted as one record) or grouped rows and
+    returns the same shape, ordered by the group columns.
+    """
+    groups = {}
+    for r in rows:
+        key = tuple(getattr(r, g) for g in group_by)
+        cur = groups.get(key)
+        if cur is None:
+            cur = groups[key] = SimpleNamespace(
+                **dict(zip(group_by, key)),
+                record_count=0,
+                **{f: Decimal("0") for f in MONEY_FIELDS},
+            )
+        cur.record_count += getattr(r, "record_count", 1)
+        for f in MONEY_FIELDS:
+            setattr(cur, f, getattr(cur, f) + (getattr(r, f) or Decimal("0")))
+    return [groups[k] for k in sorted(groups)]
+
+
+# Stable order used to walk salary records; id breaks ties so every key is unique
+RECORD_ORDER = ("year", "month", "person_id", "id")
+
+
+def after_record_q(last) -> Q:
+    """Records strictly after ``last`` (anything with the RECORD_ORDER attributes), as a keyset condition.
+
+    The leading ``year >= last.year`` is implied by the disjunction but lets
+    SQLite start the index range scan at that year instead of filtering.
+    """
+    return Q(year__gte=last.year) & (
+        Q(year__gt=last.year)
+        | Q(year=last.year, month__gt=last.month)
+        | Q(year=last.year, month=last.month, person_id__gt=last.person_id)
+        | Q(year=last.year, month=last.month, person_id=last.person_id, id__gt=last.id)
+    )
+
+
+async def iter_record_chunks(
+    query: QuerySet,
+    using_db: Optional[BaseDBAsyncClient] = None,
+    chunk_size: int = 500,
+) -> AsyncIterator[List[RecordRow]]:
+    """Walk a SalaryRecord query in RECORD_ORDER, ``chunk_size`` RecordRows per round trip.
+
+    Each chunk resumes after the last row of the previous one instead of using
+    OFFSET, so every query is a bounded index range scan and only one chunk is
+    held in memory at a time.
+    """
+    q = query.order_by(*RECORD_ORDER)
+    last = None
+    while True:
+        chunk = await fetch_rows((q.filter(after_record_q(last)) if last else q).limit(chunk_size), using_db=using_db)
+        if chunk:
+            yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last = chunk[-1]
@@ -0,0 +1,121 @@
+"""CSV / XLSX writers for the stats table exports.
+
+Both writers consume an async iterator of row chunks and yield bytes, so an
+export is fed to a StreamingResponse while the rows are still being read.
+CSV chunks go out as soon as they are formatted; XLSX rows go to openpyxl's
+write-only worksheet, which spools them to a temporary file, and the finished
+archive is sent in fixed-size pieces. Memory stays flat in both cases.
+"""
+import csv
+import io
+import tempfile
+from typing import AsyncIterator, Iterable, List, Sequence, Tuple
+
+import openpyxl
+from starlette.concurrency import run_in_threadpool
+
+
+# (row attribute, column header)
+Columns = Sequence[Tuple[str, str]]
+
+_INCOME_COLUMNS = (
+    ("base_salary", "基本工资"),
+    ("performance_salary", "绩效工资"),
+    ("high_temp_allowance", "高温补贴"),
+    ("low_temp_allowance", "低温补贴"),
+    ("computer_allowance", "电脑补贴"),
+    ("communication_allowance", "通信补贴"),
+    ("comprehensive_allowance", "综合补贴"),
+    ("meal_allowance", "餐补"),
+    ("mid_autumn_benefit", "中秋福利"),
+    ("dragon_boat_benefit", "端午福利"),
+    ("spring_festival_benefit", "春节福利"),
+    ("other_income", "其他收入"),
+)
+_DEDUCTION_COLUMNS = (
+    ("pension_insurance", "养老保险"),
+    ("medical_insurance", "医疗保险"),
+    ("unemployment_insurance", "失业保险"),
+    ("critical_illness_insurance", "大病互助"),
+    ("enterprise_annuity", "企业年金"),
+    ("housing_fund", "住房公积金"),
+    ("other_deductions", "其他扣除"),
+    ("labor_union_fee", "工会"),
+    ("performance_deduction", "绩效扣除"),
+)
+
+MONTHLY_TABLE_COLUMNS: Columns = (
+    ("person_name", "姓名"),
+    ("year", "年份"),
+    ("month", "月份"),
+    *_INCOME_COLUMNS,
+    *_DEDUCTION_COLUMNS,
+    ("income_total", "收入合计"),
+    ("deductions_total", "扣除合计"),
+    ("benefits_total", "福利合计"),
+    ("allowances_total", "补贴合计"),
+    ("actual_take_home", "实际到手"),
+    ("tax", "个税"),
+    ("note", "备注"),
+)
+
+ANNUAL_TABLE_COLUMNS: Columns = (
+    ("person_name", "姓名"),
+    ("year", "年份"),
+    *((f"{attr}_total", label) for attr, label in _INCOME_COLUMNS + _DEDUCTION_COLUMNS),
+    ("income_total", "收入合计"),
+    ("deductions_total", "扣除合计"),
+    ("benefits_total", "福利合计"),
+    ("actual_take_home_total", "实际到手"),
+    ("yoy_growth", "同比增长(%)"),
+)
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Size of the pieces a finished XLSX file is sent in
+_XLSX_READ_SIZE = 64 * 1024
+
+
+def _values(row, columns: Columns) -> list:
+    return [getattr(row, attr) for attr, _ in columns]
+
+
+async def csv_stream(columns: Columns, chunks: AsyncIterator[Iterable]) -> AsyncIterator[bytes]:
+    """Yield a UTF-8 CSV (with BOM, so Excel detects the encoding) one chunk of rows at a time."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([label for _, label in columns])
+    yield ("\ufeff" + buf.getvalue()).encode("utf-8")
+    async for rows in chunks:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(_values(r, columns) for r in rows)
+        yield buf.getvalue().encode("utf-8")
+
+
+async def xlsx_stream(columns: Columns, chunks: AsyncIterator[Iterable], title: str) -> AsyncIterator[bytes]:
+    """Yield an XLSX workbook with one sheet holding the header and every row."""
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    ws.append([label for _, label in columns])
+    async for rows in chunks:
+        for r in rows:
+            ws.append(_values(r, columns))
+
+    with tempfile.SpooledTemporaryFile(max_size=_XLSX_READ_SIZE) as out:
+        await run_in_threadpool(wb.save, out)
+        out.seek(0)
+        while True:
+            data: bytes = await run_in_threadpool(out.read, _XLSX_READ_SIZE)
+            if not data:
+                break
+            yield data
+
+
+def export_stream(fmt: str, columns: Columns, chunks: AsyncIterator[List], title: str) -> AsyncIterator[bytes]:
+    if fmt == "xlsx":
+        return xlsx_stream(columns, chunks, title)
+    return csv_stream(columns, chunks)
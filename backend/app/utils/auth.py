@@ -1,5 +1,9 @@
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 
 from jose import jwt, JWTError
 from passlib.context import CryptContext
@@ -10,12 +14,18 @@ from tortoise.exceptions import DoesNotExist
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from config import JWT_SECRET, JWT_ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from config import JWT_SECRET, JWT_ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, AUTH_CACHE_TTL, PASSWORD_HASH_CONCURRENCY
 from ..models import User
+from ..services.database import read_pool
+from ..services.metrics import PASSWORD_SLOTS, record_cache, record_password_job
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Verified tokens: token -> (user, monotonic deadline, PRAGMA data_version when loaded)
+AUTH_CACHE_SIZE = 1024
+_auth_cache: "OrderedDict[str, Tuple[User, float, int]]" = OrderedDict()
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -83,13 +93,71 @@ def hash_password(password: str) -> str:
         return pwd_context.hash(password)
 
 
+# bcrypt holds a CPU for tens of milliseconds and releases the GIL, so password work runs on a
+# small dedicated pool; the semaphore caps it and lets waiting requests be counted
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_CONCURRENCY, thread_name_prefix="password")
+_password_slots = asyncio.Semaphore(PASSWORD_HASH_CONCURRENCY)
+PASSWORD_SLOTS.set(PASSWORD_HASH_CONCURRENCY)
+
+
+async def _run_password_job(func, *args):
+    record_password_job("queued", 1)
+    try:
+        await _password_slots.acquire()
+    finally:
+        record_password_job("queued", -1)
+    record_password_job("running", 1)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_password_executor, func, *args)
+    finally:
+        record_password_job("running", -1)
+        _password_slots.release()
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the password pool, without blocking the event loop."""
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password on the password pool, without blocking the event loop."""
+    return await _run_password_job(hash_password, password)
+
+
 def create_access_token(subject: dict, expires_minutes: int = ACCESS_TOKEN_EXPIRE_MINUTES) -> str:
     expire = datetime.utcnow() + timedelta(minutes=expires_minutes)
     to_encode = {"exp": expire, **subject}
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 
+def invalidate_cached_user(user_id: int) -> None:
+    """Drop cached tokens of a user whose row changed in this worker."""
+    for token in [t for t, (u, _, _) in _auth_cache.items() if u.id == user_id]:
+        del _auth_cache[token]
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+    """Resolve the bearer token to its user.
+
+    Repeat calls with the same token are served from a short-TTL cache, which
+    skips both the JWT signature check and the user query. An entry is dropped
+    when this worker changes the user (invalidate_cached_user) and when any
+    other connection has committed since it was cached, so users never go
+    stale across workers.
+    """
+    now = time.monotonic()
+    version = None
+    entry = _auth_cache.get(token)
+    if entry is not None:
+        user, deadline, cached_version = entry
+        version = await read_pool.data_version()
+        if now < deadline and cached_version == version:
+            _auth_cache.move_to_end(token)
+            record_cache("auth", True)
+            return user
+        del _auth_cache[token]
+    record_cache("auth", False)
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -103,8 +171,19 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     except JWTError:
         raise credentials_exception
 
+    if AUTH_CACHE_TTL > 0 and version is None:
+        version = await read_pool.data_version()
     try:
         user = await User.get(username=username)
-        return user
     except DoesNotExist:
-        raise credentials_exception
\ No newline at end of file
+        raise credentials_exception
+
+    if AUTH_CACHE_TTL > 0:
+        ttl = AUTH_CACHE_TTL
+        if payload.get("exp") is not None:
+            # Never keep a token past its own expiry
+            ttl = min(ttl, payload["exp"] - time.time())
+        _auth_cache[token] = (user, now + ttl, version)
+        while len(_auth_cache) > AUTH_CACHE_SIZE:
+            _auth_cache.popitem(last=False)
+    return user
\ No newline at end of file
@@ -0,0 +1,43 @@
+"""orjson encoding for API responses.
+
+The stats builders and the salary list create their response models with
+``model_construct``: every value is computed by the server with the declared
+type already (floats for float fields, Decimal for Decimal fields), so
+validating it again would only repeat the work. Such models are encoded here
+straight from their field values, with the same JSON as Pydantic's own
+serializer produces for these schemas (Decimal as a string, int dict keys as
+strings), but without going through ``jsonable_encoder``.
+"""
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+from ..services.profiling import timed
+
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        # The field values themselves; several times faster than dict(obj) or model_dump()
+        return obj.__dict__
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+@timed("serialize")
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+class FastJSONResponse(ORJSONResponse):
+    """Default response class of the app; also returned directly by routes
+    that skip the response_model round trip."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
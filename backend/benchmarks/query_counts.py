@@ -0,0 +1,127 @@
+"""Check that the read endpoints issue a fixed number of SQL queries.
+
+Households of different sizes are seeded into a temporary database, every
+GET endpoint of the stats, persons and salaries routers is called in-process
+for each of them, and the statements each request sends to SQLite are
+counted. A count that grows with the number of persons is an N+1 query; the
+check then prints the offending endpoints and exits with status 1.
+
+    cd backend && python -m benchmarks.query_counts [--sizes 1,4,16] [--years 3]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from collections import defaultdict
+
+YEAR = 2024
+
+# Paths relative to /api; {pid} is the household's first person
+URLS = [
+    "/persons/",
+    "/salaries/",
+    "/salaries/?limit=50",
+    "/stats/monthly",
+    f"/stats/yearly?year={YEAR}",
+    f"/stats/family?year={YEAR}",
+    "/stats/cumulative-insurance",
+    f"/stats/benefits?year={YEAR}",
+    "/stats/income-composition",
+    "/stats/net-income/monthly",
+    "/stats/gross-vs-net/monthly",
+    "/stats/deductions/breakdown",
+    "/stats/contributions/cumulative?person_id={pid}",
+    f"/stats/contributions/cumulative?person_id={{pid}}&range={YEAR - 1}-06..{YEAR}-06",
+    "/stats/tables/monthly",
+    f"/stats/tables/annual?year={YEAR}",
+    f"/stats/tables/annual-monthly?year={YEAR}",
+    f"/stats/dashboard?year={YEAR}&person_id={{pid}}",
+    "/stats/dashboard",
+]
+
+
+class QueryCounter:
+    """Counts the statements run by every SQLite client, the read pool's included."""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def install(self) -> None:
+        from tortoise.backends.sqlite.client import SqliteClient
+
+        for name in ("execute_insert", "execute_many", "execute_query", "execute_query_dict", "execute_script"):
+            setattr(SqliteClient, name, self._counted(getattr(SqliteClient, name)))
+
+    def _counted(self, method):
+        async def wrapper(client, *args, **kwargs):
+            self.count += 1
+            return await method(client, *args, **kwargs)
+
+        return wrapper
+
+
+async def _seed_household(client, username: str, persons: int, years: int) -> tuple:
+    from app.models import User
+    from benchmarks.synthetic import seed_household
+
+    await client.post("/api/auth/register", json={"username": username, "password": "pw"})
+    token = (await client.post("/api/auth/login", json={"username": username, "password": "pw"})).json()["access_token"]
+    user = await User.get(username=username)
+    pids = await seed_household(user.id, persons, years, seed=persons, last_year=YEAR)
+    return {"Authorization": f"Bearer {token}"}, pids[0]
+
+
+async def _run(sizes, years: int) -> dict:
+    import httpx
+    from app.main import app
+
+    counter = QueryCounter()
+    counter.install()
+    counts = defaultdict(dict)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            households = {n: await _seed_household(client, f"household{n}", n, years) for n in sizes}
+            for n, (headers, pid) in households.items():
+                # Loads the user into the token cache, like any request after the first
+                await client.get("/api/persons/", headers=headers)
+                for url in URLS:
+                    path = "/api" + url.format(pid=pid)
+                    before = counter.count
+                    r = await client.get(path, headers=headers)
+                    if r.status_code != 200:
+                        raise SystemExit(f"{path}: HTTP {r.status_code} {r.text[:200]}")
+                    counts[url][n] = counter.count - before
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1,4,16", help="persons per household, comma separated")
+    parser.add_argument("--years", type=int, default=3)
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "bench.db")
+        os.environ["SQLITE_MAINTENANCE_INTERVAL"] = "0"
+        # Every request must reach the database
+        os.environ["STATS_CACHE_SIZE"] = "0"
+        counts = asyncio.run(_run(sizes, args.years))
+
+    print(f"{'endpoint':<72}" + "".join(f"{f'{n} p':>7}" for n in sizes))
+    failed = []
+    for url, by_size in counts.items():
+        flag = ""
+        if len(set(by_size.values())) > 1:
+            failed.append(url)
+            flag = "  <- grows with the household"
+        print(f"{url:<72}" + "".join(f"{by_size[n]:>7}" for n in sizes) + flag)
+    if failed:
+        print(f"{len(failed)} endpoint(s) issue more queries for larger households", file=sys.stderr)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
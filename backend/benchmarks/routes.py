@@ -0,0 +1,399 @@
+"""Latency, query count and peak memory of every persons, salaries and stats route.
+
+A synthetic household (``benchmarks.synthetic``) is seeded for every
+combination of ``--persons`` and ``--years``, each under its own user, into a
+temporary database. Every route of the persons, salaries and stats routers is
+then called in-process through the ASGI app for each household, reads first,
+then the writes, which leave the household as they found it (what POST
+creates, DELETE removes; import and batch rewrite a year with its own values).
+
+For each household and route the run reports:
+
+- ``p50_ms``/``p95_ms``: request latency over ``--repeat`` timed calls after
+  one warm-up call; a route stops early after ``--budget`` seconds, with at
+  least three samples.
+- ``queries``: SQL statements the request sent to SQLite (the most seen).
+- ``peak_kib``: peak Python memory allocated while serving one more call,
+  measured with tracemalloc on its own so it does not slow the timed calls.
+- ``bytes``: response body size.
+
+The table goes to stdout and ``--out`` writes the same figures as JSON, the
+baseline for later runs. ``--compare`` checks a run against such a baseline:
+a route that sends more queries, or whose p95 grew beyond ``--tolerance``
+(and by more than a few milliseconds, to ignore noise), is listed and the
+run exits with status 1. A route without a scenario here also fails the run,
+so new endpoints get benchmarked.
+
+The response cache is off unless ``--cache`` is given, so every call reaches
+the database. 1,000-person households are supported but slow to run; add
+them explicitly with ``--persons 1,10,100,1000``.
+
+    cd backend && python -m benchmarks.routes [--persons 1,10,100] [--years 1,10,30] [--repeat 10] [--out baseline.json]
+"""
+import argparse
+import asyncio
+import csv
+import datetime
+import gc
+import io
+import json
+import math
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from benchmarks.query_counts import QueryCounter
+
+ROUTERS = ("/api/persons", "/api/salaries", "/api/stats")
+MIN_SAMPLES = 3
+# p95 growth below this is noise whatever the tolerance
+NOISE_MS = 5.0
+
+
+@dataclass
+class Household:
+    persons: int
+    years: int
+    headers: dict = field(default_factory=dict)
+    pids: List[int] = field(default_factory=list)
+    year: int = 0
+    record_id: int = 0
+    # The first person's payslips of the last year, as the API returns them
+    payslips: List[dict] = field(default_factory=list)
+    created_persons: List[int] = field(default_factory=list)
+    created_records: List[int] = field(default_factory=list)
+    months_created: int = 0
+
+    @property
+    def pid(self) -> int:
+        return self.pids[0]
+
+
+@dataclass
+class Scenario:
+    method: str
+    route: str
+    # The request's path and httpx keyword arguments; None when there is nothing left to do
+    request: Callable[[Household], Optional[dict]]
+    after: Optional[Callable[[Household, object], None]] = None
+    variant: str = ""
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.route}{self.variant}"
+
+
+def _get(route: str, query: str = "", variant: str = "") -> Scenario:
+    """A read of ``route`` with ``query`` formatted with the household's attributes."""
+    def request(hh: Household) -> dict:
+        url = route.format(**vars(hh), pid=hh.pid)
+        return {"url": url + ("?" + query.format(**vars(hh), pid=hh.pid) if query else "")}
+    return Scenario("GET", route, request, variant=variant)
+
+
+def _amounts(payslip: dict) -> dict:
+    from app.models.salary_record import AMOUNT_FIELDS
+
+    return {f: payslip[f] for f in AMOUNT_FIELDS}
+
+
+def _create_person(hh: Household) -> dict:
+    return {"url": "/api/persons/", "json": {"name": f"新成员{len(hh.created_persons) + 1}"}}
+
+
+def _update_person(hh: Household) -> Optional[dict]:
+    if not hh.created_persons:
+        return None
+    return {"url": f"/api/persons/{hh.created_persons[-1]}", "json": {"note": "benchmark"}}
+
+
+def _delete_person(hh: Household) -> Optional[dict]:
+    if not hh.created_persons:
+        return None
+    return {"url": f"/api/persons/{hh.created_persons.pop()}"}
+
+
+def _create_record(hh: Household) -> dict:
+    # Months after the household's last year, so they never collide with its data
+    n = hh.months_created
+    hh.months_created += 1
+    payslip = hh.payslips[n % 12]
+    body = {"year": hh.year + 1 + n // 12, "month": n % 12 + 1, **_amounts(payslip)}
+    return {"url": f"/api/salaries/{hh.pid}", "json": body}
+
+
+def _update_record(hh: Household) -> Optional[dict]:
+    if not hh.created_records:
+        return None
+    return {"url": f"/api/salaries/{hh.created_records[-1]}", "json": {"note": "benchmark"}}
+
+
+def _delete_record(hh: Household) -> Optional[dict]:
+    if not hh.created_records:
+        return None
+    return {"url": f"/api/salaries/{hh.created_records.pop()}"}
+
+
+def _import(hh: Household) -> dict:
+    out = io.StringIO()
+    writer = csv.DictWriter(out, ["person_id", "year", "month", *_amounts(hh.payslips[0])])
+    writer.writeheader()
+    for p in hh.payslips:
+        writer.writerow({"person_id": hh.pid, "year": p["year"], "month": p["month"], **_amounts(p)})
+    return {"url": "/api/salaries/import", "files": {"file": ("salaries.csv", out.getvalue().encode(), "text/csv")}}
+
+
+def _batch(hh: Household) -> dict:
+    return {"url": "/api/salaries/batch", "json": {"update": [{"id": p["id"], **_amounts(p)} for p in hh.payslips]}}
+
+
+SCENARIOS = [
+    _get("/api/persons/"),
+    _get("/api/salaries/"),
+    _get("/api/salaries/", "limit=50", variant="?limit=50"),
+    _get("/api/salaries/", "person_id={pid}&year={year}", variant="?person_id&year"),
+    _get("/api/salaries/{record_id}"),
+    _get("/api/stats/monthly"),
+    _get("/api/stats/yearly", "year={year}"),
+    _get("/api/stats/family", "year={year}"),
+    _get("/api/stats/cumulative-insurance"),
+    _get("/api/stats/benefits", "year={year}"),
+    _get("/api/stats/income-composition"),
+    _get("/api/stats/net-income/monthly"),
+    _get("/api/stats/gross-vs-net/monthly"),
+    _get("/api/stats/deductions/breakdown"),
+    _get("/api/stats/contributions/cumulative", "person_id={pid}"),
+    _get("/api/stats/tables/monthly"),
+    _get("/api/stats/tables/monthly/export"),
+    _get("/api/stats/tables/monthly/export", "format=xlsx", variant="?format=xlsx"),
+    _get("/api/stats/tables/annual", "year={year}"),
+    _get("/api/stats/tables/annual/export"),
+    _get("/api/stats/tables/annual-monthly", "year={year}"),
+    _get("/api/stats/dashboard"),
+    _get("/api/stats/dashboard", "year={year}&person_id={pid}", variant="?year&person_id"),
+    Scenario("POST", "/api/persons/", _create_person,
+             after=lambda hh, r: hh.created_persons.append(r.json()["id"])),
+    Scenario("PUT", "/api/persons/{person_id}", _update_person),
+    Scenario("DELETE", "/api/persons/{person_id}", _delete_person),
+    Scenario("POST", "/api/salaries/{person_id}", _create_record,
+             after=lambda hh, r: hh.created_records.append(r.json()["id"])),
+    Scenario("PUT", "/api/salaries/{record_id}", _update_record),
+    Scenario("DELETE", "/api/salaries/{record_id}", _delete_record),
+    Scenario("POST", "/api/salaries/import", _import),
+    Scenario("POST", "/api/salaries/batch", _batch),
+]
+
+
+def _uncovered(app) -> List[str]:
+    """Routes of the benchmarked routers that no scenario calls."""
+    from fastapi.routing import APIRoute
+
+    covered = {(s.method, s.route) for s in SCENARIOS}
+    return sorted(
+        f"{method} {route.path}"
+        for route in app.routes
+        if isinstance(route, APIRoute) and route.path.startswith(ROUTERS)
+        for method in route.methods
+        if (method, route.path) not in covered
+    )
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+async def _call(client, counter: QueryCounter, scenario: Scenario, hh: Household):
+    """Run the scenario once: (seconds, statements, body bytes), or None when it has nothing to do."""
+    request = scenario.request(hh)
+    if request is None:
+        return None
+    url = request.pop("url")
+    before = counter.count
+    t = time.perf_counter()
+    r = await client.request(scenario.method, url, headers=hh.headers, **request)
+    elapsed = time.perf_counter() - t
+    if r.status_code >= 400:
+        raise SystemExit(f"{scenario.method} {url}: HTTP {r.status_code} {r.text[:200]}")
+    if scenario.after:
+        scenario.after(hh, r)
+    return elapsed, counter.count - before, len(r.content)
+
+
+async def _measure(client, counter: QueryCounter, scenario: Scenario, hh: Household, repeat: int, budget: float) -> dict:
+    await _call(client, counter, scenario, hh)
+    times, queries, size = [], 0, 0
+    started = time.perf_counter()
+    while len(times) < repeat:
+        if len(times) >= MIN_SAMPLES and time.perf_counter() - started > budget:
+            break
+        result = await _call(client, counter, scenario, hh)
+        if result is None:
+            break
+        elapsed, n, size = result
+        times.append(elapsed * 1000)
+        queries = max(queries, n)
+
+    gc.collect()
+    tracemalloc.start()
+    result = await _call(client, counter, scenario, hh)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "name": scenario.name,
+        "method": scenario.method,
+        "route": scenario.route,
+        "samples": len(times),
+        "p50_ms": round(_percentile(times, 0.5), 2) if times else None,
+        "p95_ms": round(_percentile(times, 0.95), 2) if times else None,
+        "queries": queries,
+        "peak_kib": round(peak / 1024, 1) if result is not None else None,
+        "bytes": size,
+    }
+
+
+def _fmt(value: Optional[float], unit: str, digits: int = 1) -> str:
+    return "-" if value is None else f"{value:.{digits}f}{unit}"
+
+
+async def _household(client, persons: int, years: int) -> Household:
+    from app.models import SalaryRecord, User
+    from benchmarks.synthetic import LAST_YEAR, seed_household
+
+    username = f"bench-{persons}x{years}"
+    await client.post("/api/auth/register", json={"username": username, "password": "pw"})
+    token = (await client.post("/api/auth/login", json={"username": username, "password": "pw"})).json()["access_token"]
+    user = await User.get(username=username)
+    hh = Household(persons, years, headers={"Authorization": f"Bearer {token}"}, year=LAST_YEAR)
+    hh.pids = await seed_household(user.id, persons, years, seed=persons * 100 + years)
+    hh.record_id = (await SalaryRecord.filter(person_id=hh.pid, year=LAST_YEAR, month=1).values_list("id", flat=True))[0]
+    return hh
+
+
+async def _run(args) -> dict:
+    import httpx
+    from app.main import app
+    from app.services.database import run_maintenance
+
+    missing = _uncovered(app)
+    if missing:
+        raise SystemExit("Routes without a benchmark scenario: " + ", ".join(missing))
+
+    counter = QueryCounter()
+    counter.install()
+    datasets = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            households = []
+            for persons in args.persons:
+                for years in args.years:
+                    t = time.perf_counter()
+                    households.append((await _household(client, persons, years), time.perf_counter() - t))
+            # Planner statistics, as the maintenance loop keeps them on a live database
+            await run_maintenance()
+
+            for hh, seed_seconds in households:
+                r = await client.get(f"/api/salaries/?person_id={hh.pid}&year={hh.year}", headers=hh.headers)
+                hh.payslips = r.json()
+                print(f"\n{hh.persons} persons x {hh.years} years, {hh.persons * hh.years * 12} records", flush=True)
+                print(f"{'route':<58}{'n':>4}{'p50':>10}{'p95':>10}{'queries':>9}{'peak':>11}{'bytes':>11}")
+                results = []
+                for scenario in SCENARIOS:
+                    m = await _measure(client, counter, scenario, hh, args.repeat, args.budget)
+                    results.append(m)
+                    print(f"{m['name']:<58}{m['samples']:>4}{_fmt(m['p50_ms'], 'ms'):>10}{_fmt(m['p95_ms'], 'ms'):>10}"
+                          f"{m['queries']:>9}{_fmt(m['peak_kib'], 'KiB', 0):>11}{m['bytes']:>11}", flush=True)
+                datasets.append({
+                    "persons": hh.persons,
+                    "years": hh.years,
+                    "records": hh.persons * hh.years * 12,
+                    "seed_seconds": round(seed_seconds, 2),
+                    "results": results,
+                })
+    return {"meta": _meta(args), "datasets": datasets}
+
+
+def _meta(args) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    env = ("AMOUNT_STORAGE", "SQLITE_PROFILE", "READ_POOL_SIZE", "STATS_CACHE_SIZE")
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "repeat": args.repeat,
+        "env": {k: os.environ.get(k) for k in env},
+    }
+
+
+def _regressions(baseline: dict, current: dict, tolerance: float) -> List[str]:
+    old = {
+        (d["persons"], d["years"], r["name"]): r
+        for d in baseline["datasets"] for r in d["results"]
+    }
+    found = []
+    for d in current["datasets"]:
+        for r in d["results"]:
+            before = old.get((d["persons"], d["years"], r["name"]))
+            if before is None or r["p95_ms"] is None or before["p95_ms"] is None:
+                continue
+            where = f"{r['name']} ({d['persons']}x{d['years']})"
+            if r["queries"] > before["queries"]:
+                found.append(f"{where}: {before['queries']} -> {r['queries']} queries")
+            grown = r["p95_ms"] - before["p95_ms"]
+            if grown > NOISE_MS and r["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                found.append(f"{where}: p95 {before['p95_ms']:.1f} -> {r['p95_ms']:.1f} ms")
+    return found
+
+
+def _ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(",")]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--persons", type=_ints, default=[1, 10, 100], help="household sizes, comma separated")
+    parser.add_argument("--years", type=_ints, default=[1, 10, 30], help="years of payslips, comma separated")
+    parser.add_argument("--repeat", type=int, default=10, help="timed calls per route")
+    parser.add_argument("--budget", type=float, default=10.0, help="seconds per route before it stops early")
+    parser.add_argument("--cache", action="store_true", help="keep the stats response cache on")
+    parser.add_argument("--out", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON to check the results against")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative p95 growth over the baseline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "bench.db")
+        os.environ["SQLITE_MAINTENANCE_INTERVAL"] = "0"
+        if not args.cache:
+            os.environ["STATS_CACHE_SIZE"] = "0"
+        report = asyncio.run(_run(args))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            found = _regressions(json.load(f), report, args.tolerance)
+        if found:
+            print("\n".join(found), file=sys.stderr)
+            print(f"{len(found)} regression(s) against {args.compare}", file=sys.stderr)
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Response serialization cost of the large stats and salary endpoints.
+
+Synthetic records (every amount filled, as Decimal like the ORM returns them)
+go through each endpoint's builder, then the response body is produced two
+ways:
+
+- ``before``: the models are validated (what constructing them with keyword
+  arguments and FastAPI's response_model check cost) and the result is
+  encoded with ``jsonable_encoder`` and the standard json module.
+- ``after``: the models as built with ``model_construct`` are encoded with
+  orjson by ``app.utils.serialization.dumps``, as the routes do now.
+
+The builder's own arithmetic is the same in both and is reported separately.
+Both bodies are decoded and compared, so a difference in the output fails the
+run.
+
+    cd backend && python -m benchmarks.serialization [--persons 5] [--years 20] [--repeat 20]
+"""
+import argparse
+import json
+import random
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Callable, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.models.salary_record import AMOUNT_FIELDS
+from app.routes import salaries, stats
+from app.schemas.salary import SalaryOut
+from app.schemas.stats import IncomeComposition, MonthlyStats, MonthlyTableRow, StatsDashboard
+from app.services.stats_queries import group_rows
+from app.services.payroll import set_totals
+from app.utils.serialization import dumps
+
+
+def make_records(persons: int, years: int, seed: int = 0) -> List[SimpleNamespace]:
+    rnd = random.Random(seed)
+    recs = []
+    for pid in range(1, persons + 1):
+        for y in range(2025 - years, 2025):
+            for m in range(1, 13):
+                amounts = {f: Decimal(rnd.randint(0, 500000)).scaleb(-2) for f in AMOUNT_FIELDS}
+                recs.append(SimpleNamespace(id=len(recs) + 1, person_id=pid, year=y, month=m, note=None, **amounts))
+    set_totals(recs)
+    return recs
+
+
+def _dashboard(recs, names):
+    return StatsDashboard.model_construct(
+        monthly=stats._build_monthly_stats(group_rows(recs, ("person_id", "year", "month"))),
+        income_composition=stats._build_income_composition(recs),
+        deductions_breakdown=stats._build_deductions_breakdown(recs),
+        table_monthly=stats._build_monthly_table(recs, names),
+    )
+
+
+def _cases(recs):
+    names = {pid: f"person {pid}" for pid in {r.person_id for r in recs}}
+    return [
+        ("/stats/tables/monthly", lambda: stats._build_monthly_table(recs, names), List[MonthlyTableRow]),
+        ("/stats/income-composition", lambda: stats._build_income_composition(recs), List[IncomeComposition]),
+        ("/stats/monthly", lambda: stats._build_monthly_stats(group_rows(recs, ("person_id", "year", "month"))), List[MonthlyStats]),
+        ("/stats/dashboard", lambda: _dashboard(recs, names), StatsDashboard),
+        ("/salaries/", lambda: salaries.to_out_many(recs), List[SalaryOut]),
+    ]
+
+
+def _best(fn: Callable, repeat: int) -> float:
+    """Fastest of ``repeat`` runs, in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return min(times) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--persons", type=int, default=5)
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    recs = make_records(args.persons, args.years)
+    print(f"{len(recs)} records")
+    print(f"{'endpoint':<28}{'build':>9}{'validate':>10}{'encode':>9}{'orjson':>9}{'before':>9}{'after':>9}{'speedup':>9}")
+    for name, build, schema in _cases(recs):
+        adapter = TypeAdapter(schema)
+        result = build()
+        # Model instances would pass validation as they are; plain data has to be checked field by field
+        raw = json.loads(dumps(result))
+
+        before_body = JSONResponse(jsonable_encoder(adapter.validate_python(raw))).body
+        after_body = dumps(result)
+        if json.loads(before_body) != json.loads(after_body):
+            raise SystemExit(f"{name}: bodies differ")
+
+        t_build = _best(build, args.repeat)
+        t_validate = _best(lambda: adapter.validate_python(raw), args.repeat)
+        validated = adapter.validate_python(raw)
+        t_encode = _best(lambda: JSONResponse(jsonable_encoder(validated)).body, args.repeat)
+        t_orjson = _best(lambda: dumps(result), args.repeat)
+        before = t_build + t_validate + t_encode
+        after = t_build + t_orjson
+        print(f"{name:<28}{t_build:>8.1f}ms{t_validate:>8.1f}ms{t_encode:>7.1f}ms{t_orjson:>7.1f}ms"
+              f"{before:>7.1f}ms{after:>7.1f}ms{before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Concurrent read/write throughput of the SQLite connection profiles.
+
+Several processes, like uvicorn workers, share one database file and run a
+mix of writes and reads for a fixed time; ops per second are reported for
+each profile. Two layers are measured:
+
+- ``app``: the app's own write path (update a record with its stored totals
+  and bump the data version, in one transaction) and read path (the grouped
+  SUM behind the stats endpoints) through Tortoise.
+- ``sqlite``: the same statements issued with the sqlite3 module on a
+  connection opened with the same pragmas, which isolates the cost of the
+  database itself from the Python work around it.
+
+    cd backend && python -m benchmarks.sqlite_profile [--workers 4] [--seconds 5] [--write-ratio 0.2]
+
+Profiles are selected through the same environment variables as the app, and
+each run uses a fresh database file created with that profile.
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+PROFILES = {
+    # SQLite's stock settings: rollback journal, synchronous=FULL
+    "rollback": {"SQLITE_PROFILE": "tuned", "SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL",
+                 "SQLITE_CACHE_SIZE_KB": "2000", "SQLITE_MMAP_SIZE": "0", "SQLITE_TEMP_STORE": "DEFAULT"},
+    # Tortoise's defaults: WAL, synchronous=FULL
+    "default": {"SQLITE_PROFILE": "default"},
+    "tuned": {"SQLITE_PROFILE": "tuned"},
+}
+MODELS = ["app.models.user", "app.models.person", "app.models.salary_record"]
+YEARS = range(2005, 2025)
+PERSONS = 3
+
+
+async def _open():
+    from tortoise import Tortoise
+    from app.services.database import tortoise_config
+    await Tortoise.init(config=tortoise_config(MODELS))
+
+
+async def _seed() -> None:
+    from tortoise import Tortoise
+    from app.models import Person, SalaryRecord, User
+    from app.services.schema import prepare_database
+    from app.services.payroll import set_totals
+
+    await _open()
+    await prepare_database()
+    user = await User.create(username="bench", password_hash="-")
+    rnd = random.Random(0)
+    for i in range(PERSONS):
+        person = await Person.create(user=user, name=f"p{i}")
+        recs = [
+            SalaryRecord(person_id=person.id, user_id=user.id, year=y, month=m,
+                         base_salary=rnd.randint(500000, 900000) / 100, tax=rnd.randint(0, 90000) / 100)
+            for y in YEARS for m in range(1, 13)
+        ]
+        set_totals(recs)
+        await SalaryRecord.bulk_create(recs)
+    await Tortoise.close_connections()
+
+
+async def _work(seconds: float, write_ratio: float, seed: int) -> dict:
+    from tortoise import Tortoise
+    from tortoise.transactions import in_transaction
+    from app.models import SalaryRecord, User
+    from app.models.salary_record import TOTAL_FIELDS
+    from app.services.cache import bump_data_version
+    from app.services.payroll import set_totals
+    from app.services.stats_queries import sum_records
+
+    await _open()
+    user = await User.get(username="bench")
+    ids = await SalaryRecord.all().values_list("id", flat=True)
+    rnd = random.Random(seed)
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            if rnd.random() < write_ratio:
+                rec = await SalaryRecord.get(id=rnd.choice(ids))
+                rec.base_salary = rnd.randint(500000, 900000) / 100
+                set_totals([rec])
+                async with in_transaction() as conn:
+                    await rec.save(using_db=conn, update_fields=["base_salary", *TOTAL_FIELDS])
+                    await bump_data_version(user.id, conn)
+                counts["writes"] += 1
+            else:
+                await sum_records(user.id, ("person_id", "month"), year=rnd.choice(YEARS))
+                counts["reads"] += 1
+        except Exception:
+            counts["errors"] += 1
+    await Tortoise.close_connections()
+    return counts
+
+
+def _connect_sqlite() -> sqlite3.Connection:
+    """A sqlite3 connection with the pragmas Tortoise applies for the configured profile."""
+    from app.services.database import tortoise_config
+    pragmas = dict(tortoise_config(MODELS)["connections"]["default"]["credentials"])
+    path = pragmas.pop("file_path")
+    pragmas.setdefault("journal_mode", "WAL")
+    pragmas.setdefault("journal_size_limit", 16384)
+    pragmas.setdefault("foreign_keys", "ON")
+    conn = sqlite3.connect(path, isolation_level=None)
+    for k, v in pragmas.items():
+        conn.execute(f"PRAGMA {k}={v}")
+    return conn
+
+
+def _work_sqlite(seconds: float, write_ratio: float, seed: int) -> dict:
+    conn = _connect_sqlite()
+    user_id = conn.execute("SELECT id FROM users WHERE username = 'bench'").fetchone()[0]
+    ids = [r[0] for r in conn.execute("SELECT id FROM salary_records")]
+    rnd = random.Random(seed)
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            if rnd.random() < write_ratio:
+                base = str(rnd.randint(5000, 9000))
+                conn.execute("BEGIN")
+                conn.execute(
+                    "UPDATE salary_records SET base_salary = ?, total_income = ?, net_income = ?, actual_take_home = ? WHERE id = ?",
+                    [base, base, base, base, rnd.choice(ids)],
+                )
+                conn.execute("UPDATE users SET data_version = data_version + 1 WHERE id = ?", [user_id])
+                conn.execute("COMMIT")
+                counts["writes"] += 1
+            else:
+                conn.execute(
+                    "SELECT person_id, month, SUM(base_salary), SUM(net_income), COUNT(*) FROM salary_records "
+                    "WHERE user_id = ? AND year = ? GROUP BY person_id, month",
+                    [user_id, rnd.choice(YEARS)],
+                ).fetchall()
+                counts["reads"] += 1
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            counts["errors"] += 1
+    conn.close()
+    return counts
+
+
+def _worker(layer: str, env: dict, seconds: float, write_ratio: float, seed: int, out) -> None:
+    os.environ.update(env)
+    if layer == "sqlite":
+        out.put(_work_sqlite(seconds, write_ratio, seed))
+    else:
+        out.put(asyncio.run(_work(seconds, write_ratio, seed)))
+
+
+def _seeder(env: dict) -> None:
+    os.environ.update(env)
+    asyncio.run(_seed())
+
+
+def run_profile(layer: str, name: str, workers: int, seconds: float, write_ratio: float) -> dict:
+    ctx = mp.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**PROFILES[name], "DATABASE_PATH": os.path.join(tmp, "bench.db"), "SQLITE_MAINTENANCE_INTERVAL": "0"}
+        seeder = ctx.Process(target=_seeder, args=(env,))
+        seeder.start()
+        seeder.join()
+        out = ctx.Queue()
+        procs = [ctx.Process(target=_worker, args=(layer, env, seconds, write_ratio, i, out)) for i in range(workers)]
+        for p in procs:
+            p.start()
+        results = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+    total = {k: sum(r[k] for r in results) for k in results[0]}
+    total.update(reads_per_s=total["reads"] / seconds, writes_per_s=total["writes"] / seconds)
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--layers", default="sqlite,app")
+    args = parser.parse_args()
+
+    print(f"{'layer':<8}{'profile':<10}{'reads/s':>10}{'writes/s':>10}{'errors':>8}")
+    for layer in args.layers.split(","):
+        for name in args.profiles.split(","):
+            r = run_profile(layer, name, args.workers, args.seconds, args.write_ratio)
+            print(f"{layer:<8}{name:<10}{r['reads_per_s']:>10.0f}{r['writes_per_s']:>10.0f}{r['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Check that several workers can start at once on a database from an old release.
+
+A temporary database is created with the schema the first release shipped
+(amounts as text, no stored totals, none of the later tables), a household is
+written into it, and ``uvicorn --workers N`` is started on it. Every worker
+runs the migrations on startup; the check waits for all of them to report
+"Application startup complete", stops the server and fails if any worker
+logged an error (such as "database is locked") or the schema was not brought
+up to date.
+
+    cd backend && python -m benchmarks.startup [--workers 2] [--timeout 60]
+"""
+import argparse
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.models.salary_record import AMOUNT_FIELDS, TOTAL_FIELDS
+
+READY = "Application startup complete"
+FAILURES = ("Traceback", "ERROR", "database is locked")
+
+_LEGACY_AMOUNTS = "".join(f'    "{f}" VARCHAR(40) NOT NULL DEFAULT 0,\n' for f in AMOUNT_FIELDS)
+
+LEGACY_SCHEMA = f"""
+CREATE TABLE "users" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "username" VARCHAR(64) NOT NULL UNIQUE,
+    "password_hash" VARCHAR(128) NOT NULL,
+    "created_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE "persons" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "name" VARCHAR(64) NOT NULL,
+    "note" VARCHAR(255),
+    "pension_history" VARCHAR(40) NOT NULL DEFAULT 0,
+    "medical_history" VARCHAR(40) NOT NULL DEFAULT 0,
+    "housing_fund_history" VARCHAR(40) NOT NULL DEFAULT 0,
+    "created_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "user_id" INT NOT NULL REFERENCES "users" ("id") ON DELETE CASCADE
+);
+CREATE TABLE "salary_records" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "year" INT NOT NULL,
+    "month" INT NOT NULL,
+{_LEGACY_AMOUNTS}    "note" VARCHAR(255),
+    "created_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "person_id" INT NOT NULL REFERENCES "persons" ("id") ON DELETE CASCADE,
+    CONSTRAINT "uid_salary_reco_person__222f64" UNIQUE ("person_id", "year", "month")
+);
+"""
+
+
+def _create_legacy_db(path: str) -> None:
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.execute("INSERT INTO users (username, password_hash) VALUES ('startup', 'x')")
+    conn.execute("INSERT INTO persons (name, user_id) VALUES ('startup', 1)")
+    conn.executemany(
+        "INSERT INTO salary_records (year, month, base_salary, tax, person_id) VALUES (2024, ?, '8000.00', '120.50', 1)",
+        [(m,) for m in range(1, 13)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def _start(db_path: str, log_path: str, workers: int, port: int, timeout: float) -> str:
+    env = dict(os.environ, DATABASE_PATH=db_path)
+    with open(log_path, "w") as log:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            env=env,
+        )
+    deadline = time.monotonic() + timeout
+    try:
+        while time.monotonic() < deadline and server.poll() is None:
+            with open(log_path) as f:
+                if f.read().count(READY) >= workers:
+                    break
+            time.sleep(0.2)
+    finally:
+        if server.poll() is None:
+            server.send_signal(signal.SIGINT)
+            try:
+                server.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+    with open(log_path) as f:
+        return f.read()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for every worker")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "startup.db")
+        _create_legacy_db(db_path)
+        output = _start(db_path, os.path.join(tmp, "uvicorn.log"), args.workers, args.port, args.timeout)
+        conn = sqlite3.connect(db_path)
+        columns = {row[1] for row in conn.execute('PRAGMA table_info("salary_records")')}
+        records = conn.execute('SELECT COUNT(*) FROM "salary_records"').fetchone()[0]
+        conn.close()
+
+    problems = []
+    ready = output.count(READY)
+    if ready < args.workers:
+        problems.append(f"{ready} of {args.workers} workers finished startup")
+    problems += [f"worker log contains {marker!r}" for marker in FAILURES if marker in output]
+    missing = [f for f in TOTAL_FIELDS if f not in columns]
+    if missing:
+        problems.append(f"salary_records lacks {', '.join(missing)} after migration")
+    if records != 12:
+        problems.append(f"salary_records holds {records} rows after migration, expected 12")
+
+    if problems:
+        print(output, file=sys.stderr)
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        raise SystemExit(1)
+    print(f"{args.workers} workers started on a legacy database and migrated it")
+
+
+if __name__ == "__main__":
+    main()
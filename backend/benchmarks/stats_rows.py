@@ -0,0 +1,98 @@
+"""Time and peak memory of a stats scan read as model instances versus rows.
+
+Seeds a temporary database with ``--persons`` people and ``--years`` years of
+monthly records, then reads all of them the way the stats routes used to
+(``SalaryRecord.filter(...).all()``) and the way they do now
+(``fetch_rows``), each followed by the monthly table builder. Time is the best
+of ``--repeat`` runs; peak memory is measured with tracemalloc in a separate
+run so it does not slow the timed ones.
+
+    cd backend && python -m benchmarks.stats_rows [--persons 10] [--years 30] [--repeat 5]
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from decimal import Decimal
+
+MODELS = ["app.models.user", "app.models.person", "app.models.salary_record"]
+
+
+async def _seed(persons: int, years: int) -> int:
+    from app.models import Person, SalaryRecord, User
+    from app.models.salary_record import AMOUNT_FIELDS
+    from app.services.payroll import set_totals
+    from app.services.schema import prepare_database
+
+    await prepare_database()
+    user = await User.create(username="bench", password_hash="-")
+    rnd = random.Random(0)
+    for i in range(persons):
+        person = await Person.create(user=user, name=f"p{i}")
+        # A few fixed monthly amounts and mostly empty columns, like real payslips
+        fixed = {f: Decimal(rnd.randint(100000, 900000)).scaleb(-2) for f in AMOUNT_FIELDS[:6]}
+        recs = [
+            SalaryRecord(person_id=person.id, user_id=user.id, year=y, month=m,
+                         **fixed, tax=Decimal(rnd.randint(0, 90000)).scaleb(-2))
+            for y in range(2025 - years, 2025) for m in range(1, 13)
+        ]
+        set_totals(recs)
+        await SalaryRecord.bulk_create(recs)
+    return user.id
+
+
+async def _measure(name: str, read, repeat: int) -> None:
+    from app.routes.stats import _build_monthly_table
+
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        rows = await read()
+        t_read = time.perf_counter() - t
+        _build_monthly_table(rows, {})
+        times.append((t_read, time.perf_counter() - t))
+    best_read = min(t for t, _ in times) * 1000
+    best_total = min(t for _, t in times) * 1000
+
+    tracemalloc.start()
+    rows = await read()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<10}{len(rows):>8}{best_read:>10.1f}ms{best_total:>10.1f}ms{peak / 2**20:>10.1f}MiB")
+
+
+async def _run(args) -> None:
+    from tortoise import Tortoise
+    from app.models import SalaryRecord
+    from app.services.database import tortoise_config
+    from app.services.stats_queries import fetch_rows
+
+    await Tortoise.init(config=tortoise_config(MODELS))
+    try:
+        user_id = await _seed(args.persons, args.years)
+        query = SalaryRecord.filter(user_id=user_id)
+        print(f"{'read':<10}{'rows':>8}{'read':>12}{'+ table':>12}{'peak':>13}")
+        await _measure("models", lambda: query.all(), args.repeat)
+        await _measure("rows", lambda: fetch_rows(query), args.repeat)
+    finally:
+        await Tortoise.close_connections()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--persons", type=int, default=10)
+    parser.add_argument("--years", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "bench.db")
+        os.environ["SQLITE_MAINTENANCE_INTERVAL"] = "0"
+        asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
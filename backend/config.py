@@ -7,4 +7,64 @@ JWT_SECRET = os.environ.get("JWT_SECRET", "super-secret-change-me")
 JWT_ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
 
-CORS_ORIGINS = os.environ.get("CORS_ORIGINS", "*").split(",")
\ No newline at end of file
+CORS_ORIGINS = os.environ.get("CORS_ORIGINS", "*").split(",")
+# Storage for salary money columns: "decimal" (default) or "cents" (64-bit integer cents)
+AMOUNT_STORAGE = os.environ.get("AMOUNT_STORAGE", "decimal").strip().lower()
+
+# Max number of cached stats responses per worker (LRU); 0 disables the cache
+STATS_CACHE_SIZE = int(os.environ.get("STATS_CACHE_SIZE", "512"))
+# Max total size in bytes of the cached stats response bodies per worker; the
+# dashboard and table responses vary a lot in size, so this bounds the memory
+STATS_CACHE_BYTES = int(os.environ.get("STATS_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+# Seconds a verified bearer token and its user stay cached per worker; 0 disables the cache
+AUTH_CACHE_TTL = float(os.environ.get("AUTH_CACHE_TTL", "60"))
+
+# Max concurrent bcrypt hash/verify jobs per worker; further logins wait in a queue
+PASSWORD_HASH_CONCURRENCY = max(1, int(os.environ.get("PASSWORD_HASH_CONCURRENCY", str(min(4, os.cpu_count() or 1)))))
+
+# SQLite connection profile: "tuned" applies SQLITE_PRAGMAS on every connection,
+# "default" keeps Tortoise's own settings (WAL, synchronous=FULL, no busy timeout)
+SQLITE_PROFILE = os.environ.get("SQLITE_PROFILE", "tuned").strip().lower()
+SQLITE_PRAGMAS = {
+    # Must precede journal_mode, which writes the header of a new file; existing files need a manual VACUUM
+    "auto_vacuum": "INCREMENTAL",
+    # Wait for a competing worker's write lock instead of failing with "database is locked"
+    "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+    # NORMAL is durable against application crashes in WAL mode; FULL also survives power loss
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    # Negative cache_size is in KiB
+    "cache_size": -int(os.environ.get("SQLITE_CACHE_SIZE_KB", "32768")),
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "temp_store": os.environ.get("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+# Seconds between background PRAGMA optimize / incremental vacuum runs; 0 disables them
+SQLITE_MAINTENANCE_INTERVAL = float(os.environ.get("SQLITE_MAINTENANCE_INTERVAL", "3600"))
+# Free pages returned to the OS per maintenance run, bounding how long the write lock is held
+SQLITE_VACUUM_PAGES = int(os.environ.get("SQLITE_VACUUM_PAGES", "2000"))
+
+# Read-only SQLite connections per worker for the stats endpoints, next to the single
+# writer connection; each has its own thread, so WAL readers run in parallel. 0 reads on the writer.
+READ_POOL_SIZE = int(os.environ.get("READ_POOL_SIZE", "4"))
+
+# Per-request profile (total, SQL, compute_payroll and serialization time) as a
+# Server-Timing header and a log line; off by default
+PROFILE_REQUESTS = os.environ.get("PROFILE_REQUESTS", "0").strip().lower() in ("1", "true", "yes", "on")
+# With profiling on, only requests at least this slow are logged; every one still gets the header
+PROFILE_LOG_MIN_MS = float(os.environ.get("PROFILE_LOG_MIN_MS", "0"))
+
+# Prometheus metrics on /api/metrics. With several workers their values are shared through
+# files in PROMETHEUS_MULTIPROC_DIR (a temp directory per server when unset).
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1").strip().lower() in ("1", "true", "yes", "on")
+# Bearer token a scraper must send to /api/metrics; when unset, only requests from the
+# host itself (loopback) are served, since the endpoint shares the public port
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+# Seconds between event-loop lag samples; 0 disables them
+EVENT_LOOP_LAG_INTERVAL = float(os.environ.get("EVENT_LOOP_LAG_INTERVAL", "0.5"))
+
+# SQL statements slower than this many ms are logged with their parameters and route; 0 disables the log
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "200"))
+# Add EXPLAIN QUERY PLAN output, and the tables it scans in full, to slow query log lines
+SLOW_QUERY_EXPLAIN = os.environ.get("SLOW_QUERY_EXPLAIN", "0").strip().lower() in ("1", "true", "yes", "on")
@@ -0,0 +1,116 @@
+"""Write every read endpoint's response for a fixed data set to a JSON file.
+
+Run once per AMOUNT_STORAGE mode by test_amount_storage.py; the storage mode
+is read at import time, so each mode needs its own interpreter.
+
+    AMOUNT_STORAGE=cents python tests/amount_responses.py out.json
+"""
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+YEARS = (2023, 2024)
+
+# Amounts on the half-cent boundary, negative corrections and large values
+# next to ordinary ones; the API takes floats, so these arrive as floats
+EDGE_AMOUNTS = (0.005, 0.015, 1.005, 2.675, 1234.565, -0.005, -1.005, -250.125, 9999999999.995, 123456789.12)
+
+
+def _amount(rnd: random.Random) -> float:
+    roll = rnd.random()
+    if roll < 0.3:
+        return 0
+    if roll < 0.5:
+        return rnd.choice(EDGE_AMOUNTS)
+    return round(rnd.uniform(0, 50000), 3)
+
+
+async def _collect() -> dict:
+    import httpx
+    from app.main import app
+    from app.models.salary_record import AMOUNT_FIELDS
+
+    rnd = random.Random(2024)
+    responses = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post("/api/auth/register", json={"username": "amounts", "password": "pw"})
+            token = (await client.post("/api/auth/login", json={"username": "amounts", "password": "pw"})).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+
+            pids = []
+            for i in range(3):
+                r = await client.post("/api/persons/", json={"name": f"p{i}", "pension_history": 100.005}, headers=headers)
+                pids.append(r.json()["id"])
+            record_ids = []
+            for pid in pids:
+                for year in YEARS:
+                    for month in range(1, 13):
+                        body = {"year": year, "month": month, **{f: _amount(rnd) for f in AMOUNT_FIELDS}}
+                        r = await client.post(f"/api/salaries/{pid}", json=body, headers=headers)
+                        r.raise_for_status()
+                        record_ids.append(r.json()["id"])
+            for rid in record_ids[::5]:
+                r = await client.put(f"/api/salaries/{rid}", json={"base_salary": 8000.125, "tax": -3.335}, headers=headers)
+                r.raise_for_status()
+            for rid in record_ids[2::9]:
+                r = await client.delete(f"/api/salaries/{rid}", headers=headers)
+                r.raise_for_status()
+            batch = [
+                {"person_id": pids[0], "year": 2025, "month": m, **{f: _amount(rnd) for f in AMOUNT_FIELDS}}
+                for m in range(1, 7)
+            ]
+            updates = [{"id": rid, "base_salary": 1234.565, "other_deductions": -0.005} for rid in record_ids[3::9][:3]]
+            r = await client.post("/api/salaries/batch", json={"create": batch, "update": updates}, headers=headers)
+            r.raise_for_status()
+            assert (r.json()["created"], r.json()["updated"]) == (len(batch), len(updates)), r.text
+
+            pid = pids[0]
+            urls = [
+                "/api/persons/",
+                "/api/salaries/",
+                f"/api/salaries/?person_id={pid}&year=2024",
+                "/api/stats/monthly",
+                "/api/stats/monthly?year=2024&month=3",
+                "/api/stats/yearly?year=2024",
+                f"/api/stats/yearly?year=2023&person_id={pid}",
+                "/api/stats/family?year=2024",
+                "/api/stats/cumulative-insurance",
+                "/api/stats/benefits?year=2024",
+                "/api/stats/income-composition",
+                "/api/stats/income-composition?range=2023-05..2024-02",
+                "/api/stats/net-income/monthly",
+                "/api/stats/gross-vs-net/monthly?range=2023-06..2025-06",
+                "/api/stats/deductions/breakdown",
+                f"/api/stats/contributions/cumulative?person_id={pid}",
+                "/api/stats/tables/monthly",
+                "/api/stats/tables/annual?year=2024",
+                "/api/stats/tables/annual-monthly?year=2023",
+                "/api/stats/dashboard?year=2024",
+                "/api/salaries/?year=2025",
+                "/api/stats/tables/monthly?year=2025",
+                "/api/stats/tables/annual?year=2025",
+            ]
+            for url in urls:
+                r = await client.get(url, headers=headers)
+                responses[url] = [r.status_code, r.json()]
+    return responses
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "amounts.db")
+        os.environ["SQLITE_MAINTENANCE_INTERVAL"] = "0"
+        responses = asyncio.run(_collect())
+    with open(sys.argv[1], "w") as f:
+        json.dump(responses, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
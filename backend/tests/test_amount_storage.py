@@ -0,0 +1,29 @@
+"""The API answers the same whether amounts are stored as decimal text or integer cents."""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SCRIPT = Path(__file__).with_name("amount_responses.py")
+
+
+def _responses(mode: str, tmp_path: Path) -> dict:
+    out = tmp_path / f"{mode}.json"
+    subprocess.run(
+        [sys.executable, str(SCRIPT), str(out)],
+        env={**os.environ, "AMOUNT_STORAGE": mode},
+        cwd=SCRIPT.parent.parent,
+        check=True,
+    )
+    return json.loads(out.read_text())
+
+
+def test_cents_storage_matches_decimal(tmp_path):
+    decimal = _responses("decimal", tmp_path)
+    cents = _responses("cents", tmp_path)
+
+    assert [url for url, (status, _) in decimal.items() if status != 200] == []
+    assert cents.keys() == decimal.keys()
+    for url, response in decimal.items():
+        assert cents[url] == response, url
@@ -0,0 +1,82 @@
+"""Rounding of money amounts to cents, on input, in storage and in the payroll totals."""
+from decimal import Decimal
+
+import pytest
+
+from app.models.fields import CentsField, decimal_to_cents, to_amount
+from app.services.payroll import compute_payroll, to_cents
+
+HALF_UP = [
+    ("1.005", "1.01"),
+    (1.005, "1.01"),
+    ("2.675", "2.68"),
+    (2.675, "2.68"),
+    (8000.125, "8000.13"),
+    ("0.004", "0.00"),
+    ("-0.005", "-0.01"),
+    (-1.005, "-1.01"),
+    ("-250.125", "-250.13"),
+    ("9999999999999.995", "10000000000000.00"),
+    (None, "0.00"),
+    ("", "0.00"),
+]
+
+
+@pytest.mark.parametrize("value, expected", HALF_UP)
+def test_to_amount_rounds_half_up(value, expected):
+    assert to_amount(value) == Decimal(expected)
+    assert str(to_amount(value)) == expected
+
+
+@pytest.mark.parametrize("value, expected", HALF_UP)
+def test_cents_agree_with_to_amount(value, expected):
+    cents = int(Decimal(expected).scaleb(2))
+    assert decimal_to_cents(value) == cents
+    assert to_cents([value]).tolist() == [cents]
+
+
+@pytest.mark.parametrize("value, expected", HALF_UP)
+def test_cents_field_round_trip(value, expected):
+    field = CentsField()
+    stored = field.to_db_value(to_amount(value), None)
+    assert isinstance(stored, int)
+    assert field.to_python_value(stored) == Decimal(expected)
+
+
+def test_large_sums_stay_exact():
+    amounts = [Decimal("9999999999999.99"), Decimal("-0.01"), Decimal("1234567.89")] * 1000
+    assert int(to_cents(amounts).sum()) == decimal_to_cents(sum(amounts))
+
+
+def test_payroll_totals_from_half_cents():
+    # Each amount is rounded on its own before the totals add them up
+    amounts = {
+        "base_salary": to_amount(0.005),
+        "performance_salary": to_amount(0.005),
+        "high_temp_allowance": 0,
+        "low_temp_allowance": 0,
+        "computer_allowance": 0,
+        "communication_allowance": 0,
+        "meal_allowance": to_amount("-0.005"),
+        "mid_autumn_benefit": 0,
+        "dragon_boat_benefit": 0,
+        "spring_festival_benefit": 0,
+        "other_income": 0,
+        "comprehensive_allowance": 0,
+        "pension_insurance": to_amount(1.005),
+        "medical_insurance": 0,
+        "unemployment_insurance": 0,
+        "critical_illness_insurance": 0,
+        "enterprise_annuity": 0,
+        "housing_fund": 0,
+        "other_deductions": to_amount(-1.005),
+        "labor_union_fee": 0,
+        "performance_deduction": 0,
+        "tax": to_amount(2.675),
+    }
+    calc = compute_payroll(**amounts)
+    assert calc["total_income"] == Decimal("0.01")
+    assert calc["non_cash_benefits"] == Decimal("-0.01")
+    assert calc["total_deductions"] == Decimal("0.00")
+    assert calc["net_income"] == Decimal("-2.67")
+    assert calc["actual_take_home"] == Decimal("0.02")
@@ -0,0 +1,50 @@
+"""Size bounds of the stats response cache."""
+from app.services.cache import ResponseCache
+
+
+def _key(user_id: int, name: str) -> tuple:
+    return (user_id, 0, name, ())
+
+
+def test_evicts_least_recently_used_over_byte_budget():
+    cache = ResponseCache(maxsize=10, maxbytes=10)
+    cache.set(_key(1, "a"), b"12345")
+    cache.set(_key(1, "b"), b"1234")
+    cache.get(_key(1, "a"))
+    cache.set(_key(1, "c"), b"12")
+
+    assert cache.get(_key(1, "b")) is None
+    assert cache.get(_key(1, "a")) == b"12345"
+    assert cache.nbytes == 7
+
+
+def test_count_limit_still_applies():
+    cache = ResponseCache(maxsize=2, maxbytes=1000)
+    for name in "abc":
+        cache.set(_key(1, name), b"x")
+
+    assert len(cache) == 2
+    assert cache.get(_key(1, "a")) is None
+    assert cache.nbytes == 2
+
+
+def test_replacing_and_dropping_entries_keeps_byte_count():
+    cache = ResponseCache(maxsize=10, maxbytes=100)
+    cache.set(_key(1, "a"), b"12345")
+    cache.set(_key(1, "a"), b"12")
+    cache.set(_key(2, "a"), b"1234")
+    assert cache.nbytes == 6
+
+    cache.invalidate_user(1)
+    assert cache.nbytes == 4
+    cache.clear()
+    assert cache.nbytes == 0
+
+
+def test_body_larger_than_budget_is_not_cached():
+    cache = ResponseCache(maxsize=10, maxbytes=4)
+    cache.set(_key(1, "a"), b"123")
+    cache.set(_key(1, "b"), b"12345")
+
+    assert cache.get(_key(1, "b")) is None
+    assert cache.get(_key(1, "a")) == b"123"
@@ -0,0 +1,42 @@
+"""compute_payroll_batch against the per-record compute_payroll it vectorizes."""
+import random
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.models.fields import to_amount
+from app.models.salary_record import AMOUNT_FIELDS, TOTAL_FIELDS
+from app.services.payroll import compute_payroll, compute_payroll_batch, set_totals, to_cents
+
+EDGE_AMOUNTS = ("0", "0.01", "0.005", "1.005", "2.675", "-0.005", "-250.125", "9999999999.995", "123456789.12")
+
+
+def _records(count: int, seed: int = 6) -> list:
+    rnd = random.Random(seed)
+
+    def amount() -> Decimal:
+        if rnd.random() < 0.3:
+            return to_amount(rnd.choice(EDGE_AMOUNTS))
+        return to_amount(f"{rnd.uniform(-1000, 60000):.3f}")
+
+    return [SimpleNamespace(**{f: amount() for f in AMOUNT_FIELDS}) for _ in range(count)]
+
+
+def test_batch_matches_scalar_row_for_row():
+    records = _records(500)
+    batch = compute_payroll_batch({f: to_cents(getattr(r, f) for r in records) for f in AMOUNT_FIELDS})
+
+    for i, rec in enumerate(records):
+        scalar = compute_payroll(**vars(rec))
+        assert set(batch) == set(scalar)
+        for key, value in scalar.items():
+            assert int(batch[key][i]) == int(value.scaleb(2)), (i, key)
+
+
+def test_set_totals_matches_scalar():
+    records = _records(50, seed=11)
+    set_totals(records)
+
+    for rec in records:
+        scalar = compute_payroll(**{f: getattr(rec, f) for f in AMOUNT_FIELDS})
+        for f in TOTAL_FIELDS:
+            assert getattr(rec, f) == scalar[f], f
@@ -70,6 +70,13 @@ export async function getAnnualTable(filter) {
   return data
 }
 
+// Server-rendered download of a stats table; `table` is 'monthly' or 'annual', format 'csv' or 'xlsx'
+export async function exportTable(table, filter, format = 'csv') {
+  const params = { ...paramsFromFilter(filter), format }
+  const { data } = await client().get(`/stats/tables/${table}/export`, { params, responseType: 'blob' })
+  return data
+}
+
 export async function getAnnualMonthlyTable(filter) {
   const params = {}
   if (filter?.year) params.year = filter.year
@@ -78,3 +85,12 @@ export async function getAnnualMonthlyTable(filter) {
   const { data } = await client().get('/stats/tables/annual-monthly', { params })
   return data
 }
+
+// Fetch several panels in one request; `panels` uses the backend panel names
+export async function getDashboard(filter, panels) {
+  const params = paramsFromFilter(filter)
+  params.panels = panels.join(',')
+  if (panels.includes('table_annual_monthly')) params.hide_empty = true
+  const { data } = await client().get('/stats/dashboard', { params })
+  return data
+}
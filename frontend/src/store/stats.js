@@ -12,6 +12,7 @@ import {
   getMonthlyTable,
   getAnnualTable,
   getAnnualMonthlyTable,
+  getDashboard,
 } from '../api/stats'
 
 function cacheKey(name, filter) {
@@ -22,6 +23,21 @@ function cacheKey(name, filter) {
   return parts.join('|')
 }
 
+// cache name -> backend dashboard panel
+const DASHBOARD_PANELS = {
+  monthly: 'monthly',
+  yearly: 'yearly',
+  family: 'family',
+  netMonthly: 'net_income_monthly',
+  grossVsNet: 'gross_vs_net_monthly',
+  incomeComposition: 'income_composition',
+  deductions: 'deductions_breakdown',
+  contribCumulative: 'contributions_cumulative',
+  tableMonthly: 'table_monthly',
+  tableAnnual: 'table_annual',
+  tableAnnualMonthly: 'table_annual_monthly',
+}
+
 export const useStatsStore = defineStore('stats', {
   state: () => ({
     // filters
@@ -133,6 +149,37 @@ export const useStatsStore = defineStore('stats', {
     async loadAnnualMonthlyTable() {
       return await this._useCache('tableAnnualMonthly', () => getAnnualMonthlyTable(this.filter))
     },
+    // Load several caches with one dashboard request; already cached or inflight ones are skipped
+    async loadDashboard(names) {
+      const filter = this.filter
+      const missing = names.filter((n) => {
+        const key = cacheKey(n, filter)
+        return !this.cache[key] && !this.inflight[key]
+      })
+      if (missing.length === 0) return
+      const request = getDashboard(filter, missing.map((n) => DASHBOARD_PANELS[n]))
+      const tasks = missing.map((name) => {
+        const key = cacheKey(name, filter)
+        this.loading[name] = true
+        this.errors[name] = null
+        const p = (async () => {
+          try {
+            const data = (await request)[DASHBOARD_PANELS[name]]
+            this.cache[key] = data
+            return data
+          } catch (e) {
+            this.errors[name] = e
+            throw e
+          } finally {
+            this.loading[name] = false
+            delete this.inflight[key]
+          }
+        })()
+        this.inflight[key] = p
+        return p
+      })
+      await Promise.allSettled(tasks)
+    },
 
     // helpers
     invalidateCache() {
@@ -153,16 +200,10 @@ export const useStatsStore = defineStore('stats', {
         this.invalidateCache()
         this.isRefreshing = true
         try {
-          const tasks = [
-            this.loadMonthlyNetIncome(),
-            this.loadGrossVsNetMonthly(),
-            this.loadIncomeComposition(),
-            this.loadDeductionsBreakdown(),
-            this.loadMonthlyTable(),
-            this.loadAnnualTable(),
-          ]
-          if (this.personId) tasks.push(this.loadContributionsCumulative())
-          await Promise.allSettled(tasks)
+          const names = ['netMonthly', 'grossVsNet', 'incomeComposition', 'deductions', 'tableMonthly']
+          if (this.year) names.push('tableAnnual')
+          if (this.personId) names.push('contribCumulative')
+          await this.loadDashboard(names)
         } finally {
           this.isRefreshing = false
         }